@@ -255,20 +255,48 @@ export default function Home() {
         setMounted(true);
     }, []);
 
+    // Data version of the last successful sync; later polls only fetch deltas
+    const dataVersion = useRef<number | null>(null);
+
+    const applyDelta = (prev: any[], delta: any, key: string, compare: (a: any, b: any) => number, max: number) => {
+        if (delta.full) return delta.upserted;
+        if (!delta.upserted.length && !delta.deleted.length) return prev;
+        const rows = new Map(prev.map((row: any) => [row[key], row]));
+        delta.deleted.forEach((k: string) => rows.delete(k));
+        delta.upserted.forEach((row: any) => rows.set(row[key], row));
+        return Array.from(rows.values()).sort(compare).slice(0, max);
+    };
+
     // Initial Fetch
     const initData = async () => {
         try {
             console.log("SYNCING DATA ROOT...");
+            const since = dataVersion.current;
+            const qs = since === null ? '' : `since=${since}`;
             const [resListings, resFeed, resFactions, resActivity] = await Promise.all([
-                fetch(`${apiBase}/listings?sort=score`),
-                fetch(`${apiBase}/feed`),
-                fetch(`${apiBase}/factions`),
-                fetch(`${apiBase}/activity/recent`)
+                fetch(`${apiBase}/listings?sort=score${qs ? '&' + qs : ''}`),
+                fetch(`${apiBase}/feed${qs ? '?' + qs : ''}`),
+                fetch(`${apiBase}/factions${qs ? '?' + qs : ''}`),
+                fetch(`${apiBase}/activity/recent${qs ? '?' + qs : ''}`)
             ]);
-            if (resListings.ok) setAgents(await resListings.json());
-            if (resFeed.ok) setFeed(await resFeed.json());
-            if (resFactions.ok) setFactions(await resFactions.json());
-            if (resActivity.ok) setRecentActivity(await resActivity.json());
+            if (!(resListings.ok && resFeed.ok && resFactions.ok && resActivity.ok)) return;
+            const [listings, feedData, factionData, activity] = await Promise.all([
+                resListings.json(), resFeed.json(), resFactions.json(), resActivity.json()
+            ]);
+            if (since === null) {
+                setAgents(listings);
+                setFeed(feedData);
+                setFactions(factionData);
+                setRecentActivity(activity);
+                const version = resListings.headers.get('X-Data-Version');
+                dataVersion.current = version === null ? null : Number(version);
+            } else {
+                setAgents((prev: any[]) => applyDelta(prev, listings, 'username', (a, b) => b.trust_score - a.trust_score, 100));
+                setFeed((prev: any[]) => applyDelta(prev, feedData, 'id', (a, b) => (b.created_at || '').localeCompare(a.created_at || ''), 50));
+                setFactions((prev: any[]) => factionData.full ? factionData.upserted : prev);
+                setRecentActivity((prev: any[]) => applyDelta(prev, activity, 'seq', (a, b) => b.seq - a.seq, 10));
+                dataVersion.current = Math.min(listings.version, feedData.version, factionData.version, activity.version);
+            }
         } catch (err) {
             console.error("DATA PROTOCOL ERROR:", err);
         }
@@ -282,6 +310,26 @@ export default function Home() {
         }
     }, [mounted, page]);
 
+    // Live updates: any pushed event triggers a (cheap) delta sync right away
+    useEffect(() => {
+        if (!mounted || page !== "dashboard" || typeof EventSource === 'undefined') return;
+        const source = new EventSource(`${apiBase}/stream`);
+        let pending: ReturnType<typeof setTimeout> | null = null;
+        const onEvent = () => {
+            if (pending) return;
+            pending = setTimeout(() => { pending = null; initData(); }, 500);
+        };
+        ['SCAN', 'CREATION', 'VOTE', 'AGENTS', 'SYNC'].forEach((type) => source.addEventListener(type, onEvent));
+        // A rejected stream (503 at capacity) leaves the source CLOSED: stay on the 10s poll
+        source.onerror = () => {
+            if (source.readyState === EventSource.CLOSED) source.close();
+        };
+        return () => {
+            if (pending) clearTimeout(pending);
+            source.close();
+        };
+    }, [mounted, page, apiBase]);
+
     const performDeepScan = async (id: string) => {
         if (!id) return;
 
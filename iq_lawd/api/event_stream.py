@@ -0,0 +1,113 @@
+"""
+IQLAWD Event Stream — In-process pub/sub for /stream and /ws
+Database event listeners publish scans, votes, agent changes and syncs
+here from whatever thread committed them. Each event is encoded once (as
+an SSE frame and as a JSON text message) and fanned out on the event loop
+to every subscriber's bounded queue; a slow client loses its oldest
+events instead of holding memory or blocking the publisher.
+"""
+import asyncio
+import itertools
+import json
+import os
+import threading
+from collections import deque
+from typing import Optional
+
+STREAM_QUEUE_SIZE = int(os.getenv("STREAM_QUEUE_SIZE", "256"))
+STREAM_MAX_CLIENTS = int(os.getenv("STREAM_MAX_CLIENTS", "5000"))
+STREAM_KEEPALIVE_SECONDS = 15
+# Retry-After sent to clients turned away at STREAM_MAX_CLIENTS
+STREAM_RETRY_AFTER_SECONDS = 30
+
+
+class Frame:
+    __slots__ = ("id", "type", "text", "sse")
+
+    def __init__(self, id: int, type: str, data: dict):
+        self.id = id
+        self.type = type
+        self.text = json.dumps({"id": id, "type": type, "data": data}, separators=(",", ":"), default=str)
+        self.sse = f"id: {id}\nevent: {type}\ndata: {self.text}\n\n".encode()
+
+
+class Subscriber:
+    def __init__(self, types: Optional[set], max_queue: int):
+        self.types = types
+        self.queue = deque(maxlen=max_queue)
+        self.ready = asyncio.Event()
+        self.dropped = 0
+
+    def offer(self, frame: Frame):
+        if self.types and frame.type not in self.types:
+            return
+        if len(self.queue) == self.queue.maxlen:
+            self.dropped += 1  # deque drops the oldest frame
+        self.queue.append(frame)
+        self.ready.set()
+
+    def drain(self) -> list:
+        frames = list(self.queue)
+        self.queue.clear()
+        self.ready.clear()
+        return frames
+
+    async def next_batch(self, timeout: float = STREAM_KEEPALIVE_SECONDS) -> list:
+        """Frames queued so far, waiting up to `timeout`; empty on timeout."""
+        if not self.queue:
+            try:
+                await asyncio.wait_for(self.ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return []
+        return self.drain()
+
+
+class EventBroker:
+    """
+    `publish()` is thread-safe and costs one hop onto the loop per event,
+    however many clients are connected. Subscribe/unsubscribe and fan-out
+    run on the loop only.
+    """
+
+    def __init__(self, max_queue: int = STREAM_QUEUE_SIZE, max_clients: int = STREAM_MAX_CLIENTS):
+        self.max_queue = max_queue
+        self.max_clients = max_clients
+        self.loop = None
+        self.subscribers = set()
+        self._ids = itertools.count(1)
+        self._ids_lock = threading.Lock()
+        self.stats = {"published": 0, "delivered": 0, "dropped": 0, "rejected": 0}
+
+    def bind(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+
+    def publish(self, type: str, data: dict):
+        if self.loop is None or not self.subscribers:
+            return
+        with self._ids_lock:
+            frame = Frame(next(self._ids), type, data)
+        self.loop.call_soon_threadsafe(self._fanout, frame)
+
+    def _fanout(self, frame: Frame):
+        self.stats["published"] += 1
+        for subscriber in self.subscribers:
+            subscriber.offer(frame)
+        self.stats["delivered"] += len(self.subscribers)
+
+    def subscribe(self, types: Optional[set] = None) -> Optional[Subscriber]:
+        if len(self.subscribers) >= self.max_clients:
+            self.stats["rejected"] += 1
+            return None
+        subscriber = Subscriber(types, self.max_queue)
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self.subscribers.discard(subscriber)
+        self.stats["dropped"] += subscriber.dropped
+
+    def metrics(self) -> dict:
+        stats = dict(self.stats)
+        stats["clients"] = len(self.subscribers)
+        stats["queued"] = sum(len(s.queue) for s in self.subscribers)
+        return stats
@@ -0,0 +1,213 @@
+"""
+IQLAWD Rate Limit — Per-client limits on upstream-backed endpoints
+/analyze, /scan_ca, /debate and /launch-agent each spend Moltbook,
+DexScreener or OpenAI quota. Every (client IP, route) pair gets a token
+bucket held in lock-sharded in-process tables; over the limit the request
+is answered with a 429 and Retry-After before it reaches the endpoint.
+With RATE_LIMIT_DB set, workers share a sliding-window counter in a small
+SQLite file instead, and fall back to their local buckets if it's busy.
+"""
+import asyncio
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from fastapi.responses import JSONResponse
+
+
+def _limit(env: str, default: str) -> Tuple[int, float]:
+    """'count/seconds' -> (count, seconds)."""
+    count, seconds = os.getenv(env, default).split("/")
+    return int(count), float(seconds)
+
+
+# route -> (requests, per seconds)
+RATE_LIMITS = {
+    "/analyze": _limit("RATE_LIMIT_ANALYZE", "20/60"),
+    "/scan_ca": _limit("RATE_LIMIT_SCAN_CA", "20/60"),
+    "/debate": _limit("RATE_LIMIT_DEBATE", "10/60"),
+    "/launch-agent": _limit("RATE_LIMIT_LAUNCH_AGENT", "3/3600"),
+}
+RATE_LIMIT_SHARDS = int(os.getenv("RATE_LIMIT_SHARDS", "16"))
+# Buckets kept per shard; idle (full) buckets are dropped first
+RATE_LIMIT_SHARD_SIZE = int(os.getenv("RATE_LIMIT_SHARD_SIZE", "4096"))
+# Optional SQLite file shared by all workers (e.g. several pm2 instances)
+RATE_LIMIT_DB = os.getenv("RATE_LIMIT_DB", "")
+RATE_LIMIT_DB_TIMEOUT_MS = 50
+
+
+class _Shard:
+    __slots__ = ("lock", "buckets")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.buckets = OrderedDict()  # key -> [tokens, updated_at]
+
+
+class TokenBuckets:
+    """
+    Token buckets spread over independently locked shards, so concurrent
+    requests from different clients rarely contend on the same lock.
+    """
+
+    def __init__(self, shards: int = RATE_LIMIT_SHARDS, shard_size: int = RATE_LIMIT_SHARD_SIZE):
+        self.shards = [_Shard() for _ in range(max(1, shards))]
+        self.shard_size = shard_size
+
+    def hit(self, key: tuple, limit: int, period: float, now: float = None) -> Tuple[bool, float]:
+        """Take one token. Returns (allowed, seconds until a token is available)."""
+        now = time.monotonic() if now is None else now
+        rate = limit / period
+        shard = self.shards[hash(key) % len(self.shards)]
+        with shard.lock:
+            bucket = shard.buckets.get(key)
+            if bucket is None:
+                bucket = shard.buckets[key] = [float(limit), now]
+                if len(shard.buckets) > self.shard_size:
+                    self._evict(shard, now, period)
+            else:
+                bucket[0] = min(limit, bucket[0] + (now - bucket[1]) * rate)
+                bucket[1] = now
+                shard.buckets.move_to_end(key)
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return True, 0.0
+            return False, (1 - bucket[0]) / rate
+
+    def _evict(self, shard: _Shard, now: float, period: float):
+        # Least recently used first; a bucket idle for a full period is full again anyway
+        while len(shard.buckets) > self.shard_size:
+            key, (_, updated) = next(iter(shard.buckets.items()))
+            if now - updated < period and len(shard.buckets) <= self.shard_size * 2:
+                break
+            del shard.buckets[key]
+
+    def __len__(self):
+        return sum(len(shard.buckets) for shard in self.shards)
+
+
+class SlidingWindowStore:
+    """
+    Sliding-window counters in SQLite, shared across processes. The count
+    is the current fixed window plus the previous one weighted by how much
+    of it still overlaps the sliding window: one small transaction per hit.
+    """
+
+    PRUNE_EVERY = 1000
+
+    def __init__(self, path: str, timeout_ms: int = RATE_LIMIT_DB_TIMEOUT_MS):
+        self.path = path
+        self.timeout_ms = timeout_ms
+        self._local = threading.local()
+        self._hits = 0
+        with self._connect() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS rate_windows (
+                    key TEXT NOT NULL,
+                    window INTEGER NOT NULL,
+                    count INTEGER NOT NULL,
+                    PRIMARY KEY (key, window)
+                ) WITHOUT ROWID
+            ''')
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout_ms / 1000, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn = conn
+        return conn
+
+    def hit(self, key: tuple, limit: int, period: float, now: float = None) -> Tuple[bool, float]:
+        now = time.time() if now is None else now
+        window = int(now // period)
+        elapsed = now - window * period
+        name = "|".join(key)
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            counts = dict(conn.execute(
+                "SELECT window, count FROM rate_windows WHERE key = ? AND window IN (?, ?)",
+                (name, window - 1, window),
+            ).fetchall())
+            previous, current = counts.get(window - 1, 0), counts.get(window, 0)
+            weight = 1 - elapsed / period
+            if previous * weight + current < limit:
+                conn.execute('''
+                    INSERT INTO rate_windows (key, window, count) VALUES (?, ?, 1)
+                    ON CONFLICT(key, window) DO UPDATE SET count = count + 1
+                ''', (name, window))
+                allowed, retry_after = True, 0.0
+            elif current >= limit:
+                allowed, retry_after = False, period - elapsed
+            else:
+                # Wait until the previous window's share has decayed enough
+                allowed, retry_after = False, period * (1 - (limit - current) / previous) - elapsed
+            self._hits += 1
+            if self._hits % self.PRUNE_EVERY == 0:
+                conn.execute("DELETE FROM rate_windows WHERE window < ?", (window - 1,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return allowed, retry_after
+
+
+class RateLimiter:
+    def __init__(self, limits: Dict[str, tuple] = None, shared_path: str = RATE_LIMIT_DB):
+        self.limits = RATE_LIMITS if limits is None else limits
+        self.buckets = TokenBuckets()
+        self.shared = SlidingWindowStore(shared_path) if shared_path else None
+        self.stats = {"allowed": 0, "limited": 0, "shared_errors": 0}
+
+    async def check(self, route: str, client: str) -> Tuple[bool, float]:
+        limit, period = self.limits[route]
+        key = (client, route)
+        if self.shared is not None:
+            try:
+                allowed, retry_after = await asyncio.to_thread(self.shared.hit, key, limit, period)
+            except sqlite3.Error as e:
+                self.stats["shared_errors"] += 1
+                print(f"⚠️ Shared rate limit store unavailable, using local buckets: {e}")
+                allowed, retry_after = self.buckets.hit(key, limit, period)
+        else:
+            allowed, retry_after = self.buckets.hit(key, limit, period)
+        self.stats["allowed" if allowed else "limited"] += 1
+        return allowed, retry_after
+
+    def metrics(self) -> dict:
+        stats = dict(self.stats)
+        stats["buckets"] = len(self.buckets)
+        stats["shared"] = self.shared is not None
+        return stats
+
+
+class RateLimitMiddleware:
+    """ASGI middleware applying `limiter` to the routes it has limits for."""
+
+    def __init__(self, app, limiter: RateLimiter):
+        self.app = app
+        self.limiter = limiter
+
+    async def __call__(self, scope, receive, send):
+        route = scope.get("path") if scope["type"] == "http" else None
+        if route not in self.limiter.limits or scope.get("method") == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+        client: Optional[tuple] = scope.get("client")
+        allowed, retry_after = await self.limiter.check(route, client[0] if client else "unknown")
+        if allowed:
+            await self.app(scope, receive, send)
+            return
+        retry_after = max(1, math.ceil(retry_after))
+        response = JSONResponse(
+            {"error": f"Rate limit exceeded for {route}. Retry in {retry_after}s."},
+            status_code=429,
+            headers={"Retry-After": str(retry_after)},
+        )
+        await response(scope, receive, send)
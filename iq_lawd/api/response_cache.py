@@ -0,0 +1,133 @@
+"""
+IQLAWD Response Cache — Versioned, pre-encoded API responses
+Read endpoints are cached per (path, query string) together with the DB
+data version they were built at. Bodies are stored already JSON-encoded
+and gzip-compressed, so a repeated poll is a dict lookup plus a write of
+bytes, and a client that sends back the ETag gets a bodiless 304.
+"""
+import gzip
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from fastapi import Request, Response
+
+from iq_lawd.fast_json import dumps
+
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "512"))
+# How long the data version is trusted without a local write; bounds how
+# stale a response can be after a write from another process
+RESPONSE_CACHE_VERSION_TTL = float(os.getenv("RESPONSE_CACHE_VERSION_TTL", "1.0"))
+GZIP_MIN_BYTES = 1024
+GZIP_LEVEL = 6
+
+
+class CachedBody:
+    __slots__ = ("version", "etag", "body", "gzipped", "headers")
+
+    def __init__(self, version: int, body: bytes, headers: dict):
+        self.version = version
+        self.body = body
+        # Content-only ETag: a version bump that didn't change this body still gets a 304
+        self.etag = 'W/"%s"' % hashlib.blake2b(body, digest_size=12).hexdigest()
+        self.gzipped = gzip.compress(body, GZIP_LEVEL) if len(body) >= GZIP_MIN_BYTES else None
+        self.headers = headers
+
+
+def encode_json(payload) -> bytes:
+    return dumps(payload)
+
+
+class FastJSONResponse(Response):
+    """JSON response encoded by orjson, skipping FastAPI's jsonable_encoder pass."""
+
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+class ResponseCache:
+    """
+    LRU of CachedBody keyed by request path and query. An entry is served
+    only while its data version is current; `invalidate()` (hooked to the
+    DB writer's commits) forces the next request to re-read the version.
+    """
+
+    def __init__(self, version_source, max_entries: int = RESPONSE_CACHE_SIZE,
+                 version_ttl: float = RESPONSE_CACHE_VERSION_TTL):
+        self.version_source = version_source  # async () -> int
+        self.max_entries = max_entries
+        self.version_ttl = version_ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = None
+        self._version_at = 0.0
+        self.stats = {"hits": 0, "misses": 0, "not_modified": 0, "evictions": 0}
+
+    def invalidate(self):
+        self._version = None
+
+    async def version(self) -> int:
+        version = self._version
+        if version is None or time.monotonic() - self._version_at > self.version_ttl:
+            version = await self.version_source()
+            self._version, self._version_at = version, time.monotonic()
+        return version
+
+    @staticmethod
+    def key_for(request: Request) -> tuple:
+        return (request.url.path, tuple(sorted(request.query_params.multi_items())))
+
+    def get(self, key: tuple, version: int):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.version != version:
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: tuple, entry: CachedBody):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    async def serve(self, request: Request, build) -> Response:
+        """
+        Answer from cache, or `await build(version)` -> (payload, headers)
+        and cache the encoded result under the version it was built at.
+        """
+        version = await self.version()
+        key = self.key_for(request)
+        entry = self.get(key, version)
+        if entry is None:
+            self.stats["misses"] += 1
+            payload, headers = await build(version)
+            entry = CachedBody(version, encode_json(payload), headers)
+            self.put(key, entry)
+        else:
+            self.stats["hits"] += 1
+        return self.respond(request, entry)
+
+    def respond(self, request: Request, entry: CachedBody) -> Response:
+        headers = {"ETag": entry.etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+        headers.update(entry.headers)
+        if entry.etag in request.headers.get("if-none-match", ""):
+            self.stats["not_modified"] += 1
+            return Response(status_code=304, headers=headers)
+        if entry.gzipped is not None and "gzip" in request.headers.get("accept-encoding", ""):
+            headers["Content-Encoding"] = "gzip"
+            return Response(content=entry.gzipped, media_type="application/json", headers=headers)
+        return Response(content=entry.body, media_type="application/json", headers=headers)
+
+    def metrics(self) -> dict:
+        stats = dict(self.stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["entries"] = len(self._entries)
+        stats["hit_ratio"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        return stats
@@ -2,39 +2,78 @@
 IQLAWD API Server — Moltbook Agent Verification Intelligence
 All endpoints serve real Moltbook AI agent data.
 """
+import asyncio
 import os
 import sys
+import time
+from datetime import datetime
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Query, Request, WebSocket, WebSocketDisconnect
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import Optional
-
-from iq_lawd.database import Database
+from typing import List, Optional
+
+from iq_lawd.database import get_db, EVENTS_MAX_PAGE_SIZE
+from iq_lawd.metrics import registry, instrument_http_clients, RequestMetricsMiddleware, SYNC_SECONDS
+from iq_lawd.tracing import TracingMiddleware, slow_log
+from iq_lawd.profiling import profiler, is_admin, ProfileMiddleware, ADMIN_TOKEN, ADMIN_HEADER, PROFILE_MAX_SECONDS
+from iq_lawd.async_database import get_async_db
+from iq_lawd.api.response_cache import ResponseCache, FastJSONResponse
+from iq_lawd.fast_json import json_array
+from iq_lawd.api.event_stream import EventBroker, STREAM_RETRY_AFTER_SECONDS
+from iq_lawd.api.rate_limit import RateLimiter, RateLimitMiddleware
+from iq_lawd.api.single_flight import SingleFlight, normalize_key, ANALYZE_FRESH_SECONDS, DEBATE_FRESH_SECONDS
 from iq_lawd.integrations.moltbook_api_client import MoltbookAPIClient
 from iq_lawd.integrations.dexscreener_client import DexScreenerClient
 from iq_lawd.integrations.council_engine import CouncilEngine
 from iq_lawd.integrations.agent_launcher import AgentLauncher
+from iq_lawd.engine.risk_monitor import RiskMonitor
+from iq_lawd.vote_aggregator import VoteAggregator
 
 app = FastAPI(title="IQLAWD - Trust Intelligence", version="5.1")
 
+# Innermost first: requests are traced, profiled on request and timed once
+# routed; rate limiting runs before that, and CORS wraps everything so 429s
+# still carry CORS headers
+app.add_middleware(TracingMiddleware)
+app.add_middleware(ProfileMiddleware)
+app.add_middleware(RequestMetricsMiddleware)
+rate_limiter = RateLimiter()
+app.add_middleware(RateLimitMiddleware, limiter=rate_limiter)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Data-Version", "ETag", "Retry-After", "X-Profile-File", "X-Profile"],
 )
 
 # Initialize
-db = Database()
+db = get_db()
+adb = get_async_db()
 moltbook = MoltbookAPIClient()
 dexscreener = DexScreenerClient()
 council = CouncilEngine()
 launcher = AgentLauncher()
+risk_monitor = RiskMonitor()
+votes = VoteAggregator(db)
+response_cache = ResponseCache(adb.data_version)
+db.writer.commit_listeners.append(response_cache.invalidate)
+broker = EventBroker()
+db.add_event_listener(broker.publish)
+analyze_flight = SingleFlight("analyze", ANALYZE_FRESH_SECONDS)
+debate_flight = SingleFlight("debate", DEBATE_FRESH_SECONDS)
+
+instrument_http_clients()
+last_sync = {"finished_at": 0.0}
+
+# Public batch score API limits
+SCORES_BATCH_MAX = int(os.getenv("SCORES_BATCH_MAX", "5000"))
+SCORES_STREAM_CHUNK = 1000
 
 # ── Models ──────────────────────────────────────────────────
 
@@ -50,6 +89,9 @@ class ScanCAInput(BaseModel):
 class DebateInput(BaseModel):
     agent_id: str
 
+class ScoresInput(BaseModel):
+    usernames: List[str]  # Moltbook usernames or CAs
+
 class LaunchAgentInput(BaseModel):
     name: str
     description: str
@@ -58,51 +100,102 @@ class LaunchAgentInput(BaseModel):
 # ── API Endpoints ───────────────────────────────────────────
 
 @app.get("/listings")
-def get_listings(sort: str = "score"):
+async def get_listings(
+    request: Request,
+    sort: str = "score",
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    faction: Optional[str] = None,
+    risk_status: Optional[str] = None,
+    min_score: Optional[float] = None,
+    max_score: Optional[float] = None,
+    is_claimed: Optional[bool] = None,
+    since: Optional[int] = None,
+):
     """
-    Get all verified Moltbook agents ranked by trust score.
+    Get verified Moltbook agents ranked by trust score, one keyset page at a time.
+    The cursor for the next page is returned in the X-Next-Cursor header.
+    With `since=<X-Data-Version>`, returns only agents changed after that version.
     """
-    return db.get_listings(sort_by=sort)
+    if cursor and since is None:
+        try:
+            db.decode_cursor(cursor, sort if sort in db.LISTING_SORTS else "trust_score")
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+
+    async def build(version):
+        if since is not None:
+            return await adb.get_listings_delta(
+                since, sort_by=sort, limit=limit, faction=faction, risk_status=risk_status,
+                min_score=min_score, max_score=max_score, is_claimed=is_claimed,
+            ), {}
+        page = await adb.get_listings_page(
+            sort_by=sort, limit=limit, cursor=cursor, faction=faction,
+            risk_status=risk_status, min_score=min_score, max_score=max_score,
+            is_claimed=is_claimed, encoded=True,
+        )
+        headers = {"X-Data-Version": str(version)}
+        if page["next_cursor"]:
+            headers["X-Next-Cursor"] = page["next_cursor"]
+        return page["items"], headers
+
+    return await response_cache.serve(request, build)
 
 
 @app.get("/feed")
-def get_feed(limit: int = 50):
+async def get_feed(request: Request, limit: int = 50, since: Optional[int] = None):
     """
     Get real Moltbook posts from tracked agents.
+    With `since=<X-Data-Version>`, returns only posts added or changed after that version.
     """
-    return db.get_feed(limit=limit)
+    async def build(version):
+        if since is not None:
+            return await adb.get_feed_delta(since, limit=limit), {}
+        return await adb.get_feed(limit=limit, encoded=True), {"X-Data-Version": str(version)}
+
+    return await response_cache.serve(request, build)
 
 
 @app.get("/factions")
-def get_factions():
+async def get_factions(request: Request, since: Optional[int] = None):
     """
     Get faction groupings of agents.
+    With `since=<X-Data-Version>`, returns nothing unless an agent changed after that version.
     """
-    return db.get_factions()
+    async def build(version):
+        if since is not None:
+            return await adb.get_factions_delta(since), {}
+        return await adb.get_factions(encoded=True), {"X-Data-Version": str(version)}
+
+    return await response_cache.serve(request, build)
 
 
 @app.get("/activity")
-def get_activity():
+async def get_activity(request: Request, limit: int = Query(30, ge=1, le=EVENTS_MAX_PAGE_SIZE),
+                       before: Optional[int] = None):
     """
     Get recent vote activity.
     """
-    return db.get_activity_feed()
+    async def build(version):
+        return await adb.get_activity_feed(limit=limit, before=before), {"X-Data-Version": str(version)}
+
+    return await response_cache.serve(request, build)
 
 
 @app.post("/vote/{agent_username}")
-def vote_agent(agent_username: str, vote: VoteInput, request: Request):
+async def vote_agent(agent_username: str, vote: VoteInput, request: Request):
     """
     Vote UP/DOWN for a Moltbook agent.
     """
     client_ip = request.client.host
-    success = db.add_vote(agent_username, vote.vote_type, client_ip)
+    success = votes.add(agent_username, vote.vote_type, client_ip)
     if not success:
         return {"status": "error", "message": "Vote failed"}
     return {"status": "success", "vote": vote.vote_type}
 
 
 @app.post("/scan_ca")
-def scan_contract_address(data: ScanCAInput):
+async def scan_contract_address(data: ScanCAInput):
     """
     Scan a token by contract address via DexScreener.
     Useful for identifying "Rising Star" agents not yet on Moltbook.
@@ -110,7 +203,7 @@ def scan_contract_address(data: ScanCAInput):
     ca = data.ca.strip()
     print(f"📊 Scanning Contract Address: {ca}")
     
-    token_data = dexscreener.get_token_data(ca)
+    token_data = await asyncio.to_thread(dexscreener.get_token_data, ca)
     if not token_data:
         return {"error": "Token not found on DexScreener. Ensure the CA is correct."}
     
@@ -155,8 +248,10 @@ def scan_contract_address(data: ScanCAInput):
         "last_updated": datetime.now().isoformat()
     }
     
-    db.upsert_agent(agent_info)
-    db.log_activity('SCAN', ca, agent_info["display_name"])
+    uow = db.unit_of_work()
+    uow.upsert_agent(agent_info)
+    uow.log_activity('SCAN', ca, agent_info["display_name"])
+    await adb.run(uow.commit, write=True, name="scan_ca")
     
     return {
         "agent_id": ca,
@@ -174,20 +269,25 @@ def scan_contract_address(data: ScanCAInput):
 
 
 @app.post("/analyze")
-def analyze_agent(data: AnalyzeInput):
+async def analyze_agent(data: AnalyzeInput):
     """
     Deep scan a Moltbook agent — fetches real-time data from Moltbook API.
+    Concurrent scans of the same handle share one fetch and one write.
     """
     username = data.agent_id
+    return await analyze_flight.do(normalize_key(username), lambda: _analyze(username))
+
+
+async def _analyze(username: str):
     print(f"🔍 Deep Scan requested for: {username}")
 
     # Fetch fresh data from Moltbook API
-    agent_data = moltbook.fetch_agent(username)
+    agent_data = await asyncio.to_thread(moltbook.fetch_agent, username)
 
     if not agent_data:
-        cached = db.get_agent(username)
+        cached = await adb.get_agent(username)
         if cached:
-            db.log_activity('SCAN', username, cached.get("display_name", username))
+            await adb.log_activity('SCAN', username, cached.get("display_name", username))
             return {
                 "agent_id": username,
                 "username": username,
@@ -205,11 +305,11 @@ def analyze_agent(data: AnalyzeInput):
             }
         return {"error": f"Agent '{username}' not found on Moltbook"}
 
-    db.upsert_agent(agent_data)
-    for post in agent_data.get("posts", []):
-        db.upsert_post(post)
-    
-    db.log_activity('SCAN', username, agent_data["display_name"])
+    uow = db.unit_of_work()
+    uow.upsert_agent(agent_data)
+    uow.upsert_posts(agent_data.get("posts", []))
+    uow.log_activity('SCAN', username, agent_data["display_name"])
+    await adb.run(uow.commit, write=True, name="analyze")
 
     return {
         "agent_id": username,
@@ -238,28 +338,116 @@ def analyze_agent(data: AnalyzeInput):
 
 
 @app.get("/activity/recent")
-def get_recent_activity(limit: int = 10):
+async def get_recent_activity(request: Request, limit: int = Query(10, ge=1, le=EVENTS_MAX_PAGE_SIZE),
+                              before: Optional[int] = None, since: Optional[int] = None):
     """
     Get combined creation and scan history.
+    Pass the last item's `seq` as `before` to page further back, or
+    `since=<X-Data-Version>` for only the entries recorded after that version.
+    """
+    async def build(version):
+        if since is not None:
+            return await adb.get_recent_activity_delta(since, limit=limit), {}
+        return await adb.get_recent_activity(limit=limit, before=before), {"X-Data-Version": str(version)}
+
+    return await response_cache.serve(request, build)
+
+
+@app.get("/events")
+async def get_events(request: Request, types: Optional[str] = None, before: Optional[int] = None,
+                     limit: int = Query(50, ge=1, le=EVENTS_MAX_PAGE_SIZE)):
+    """
+    Unified event stream (CREATION, SCAN, VOTE, SYNC, ORACLE), newest first.
+    `types` is a comma-separated filter; the next page cursor is in X-Next-Cursor.
+    """
+    type_list = [t.strip().upper() for t in types.split(",") if t.strip()] if types else None
+
+    async def build(version):
+        page = await adb.get_events(type_list, before=before, limit=limit)
+        headers = {"X-Next-Cursor": page["next_cursor"]} if page["next_cursor"] else {}
+        return page["items"], headers
+
+    return await response_cache.serve(request, build)
+
+
+def _stream_types(types: Optional[str]):
+    return {t.strip().upper() for t in types.split(",") if t.strip()} if types else None
+
+
+@app.get("/stream")
+async def stream_events(request: Request, types: Optional[str] = None):
     """
-    return db.get_recent_activity(limit=limit)
+    Server-Sent Events feed of live activity: SCAN, CREATION, VOTE (with fresh
+    counters), AGENTS (trust/rank changes from syncs) and SYNC.
+    `types` is an optional comma-separated filter. At capacity the answer is
+    a 503, which makes EventSource give up instead of reconnecting.
+    """
+    subscriber = broker.subscribe(_stream_types(types))
+    if subscriber is None:
+        return JSONResponse(
+            {"error": "Too many live connections, fall back to polling."},
+            status_code=503, headers={"Retry-After": str(STREAM_RETRY_AFTER_SECONDS)},
+        )
+
+    async def frames():
+        try:
+            yield b"retry: 3000\n\n"
+            while not await request.is_disconnected():
+                batch = await subscriber.next_batch()
+                if not batch:
+                    yield b": keepalive\n\n"
+                    continue
+                yield b"".join(frame.sse for frame in batch)
+        finally:
+            broker.unsubscribe(subscriber)
+
+    return StreamingResponse(frames(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.websocket("/ws")
+async def websocket_events(websocket: WebSocket, types: Optional[str] = None):
+    """Same feed as /stream over a WebSocket, one JSON message per event."""
+    await websocket.accept()
+    subscriber = broker.subscribe(_stream_types(types))
+    if subscriber is None:
+        # 1013 Try Again Later: the client should poll instead of reconnecting right away
+        await websocket.close(code=1013, reason="Too many live connections, fall back to polling.")
+        return
+    try:
+        while True:
+            batch = await subscriber.next_batch()
+            if not batch:
+                # Keepalive doubles as dead-connection detection
+                await websocket.send_text('{"type":"keepalive"}')
+            for frame in batch:
+                await websocket.send_text(frame.text)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        broker.unsubscribe(subscriber)
 
 
 @app.post("/debate")
-def get_council_debate(data: DebateInput):
+async def get_council_debate(data: DebateInput):
     """
     Simulated debate between Council personas for a given agent.
+    Repeat requests for the same agent within the freshness window reuse the verdict.
     """
     username = data.agent_id
+    return await debate_flight.do(normalize_key(username), lambda: _debate(username))
+
+
+async def _debate(username: str):
     print(f"⚖️ The Council is convening for: {username}")
     
-    agent = db.get_agent(username)
+    agent = await adb.get_agent(username)
     if not agent:
         # Fallback to fetching fresh
-        agent = moltbook.fetch_agent(username)
+        agent = await asyncio.to_thread(moltbook.fetch_agent, username)
         if not agent:
             # Maybe it's a CA?
-            token = dexscreener.get_token_data(username)
+            token = await asyncio.to_thread(dexscreener.get_token_data, username)
             if token:
                 # Mock agent structure for DexScreener token
                 agent = {"trust_score": 50} # Default mid for unverified CA
@@ -273,25 +461,49 @@ def get_council_debate(data: DebateInput):
     }
 
 
+def _search_agents(q: str, limit: int):
+    results = db.autocomplete.complete(q, limit)
+    if not results:
+        results = db.autocomplete.complete(q, limit, fuzzy=True)
+    if not results:
+        results = db.search_agents(q, limit)
+    return results
+
+
 @app.get("/agents/search")
-def search_agents_api(q: str = "", limit: int = 10):
+async def search_agents_api(q: str = "", limit: int = 10):
     """
     Search for agents in the local database.
+    Handle prefixes are answered from the in-memory autocomplete index
+    (tolerating one typo); anything else falls back to full-text search.
     """
     if not q:
         return []
-    results = db.search_agents(q, limit)
-    return results
+    return await adb.run(_search_agents, q, limit, name="search_agents")
+
+
+@app.get("/agents/{username}/history")
+async def get_agent_history(username: str, days: float = 7, resolution: Optional[int] = None):
+    """
+    Trust score / karma / followers time series for charts, plus trust decay status.
+    """
+    end = int(time.time())
+    points = await adb.get_metrics_history(username, start=end - int(days * 86400), end=end, resolution=resolution)
+    return {
+        "username": username,
+        "points": points,
+        "trust_decay": risk_monitor.monitor_trust_decay([p["trust_score"] for p in points]),
+    }
 
 
 @app.post("/launch-agent")
-def launch_agent(data: LaunchAgentInput):
+async def launch_agent(data: LaunchAgentInput):
     """
     Launch a new Moltbook agent via IQLAWD.
     Limit: 1 agent per Twitter/X account.
     """
     print(f"🚀 Agent Launch requested: {data.name} (@{data.x_handle})")
-    result = launcher.launch_agent(data.name, data.description, data.x_handle)
+    result = await asyncio.to_thread(launcher.launch_agent, data.name, data.description, data.x_handle)
     return result
 
 
@@ -302,20 +514,19 @@ def launch_stats():
 
 
 @app.post("/sync")
-def sync_agents():
+async def sync_agents():
     """
     Sync all tracked agents from Moltbook API.
     """
-    agents = moltbook.fetch_all_tracked_agents()
-    for agent in agents:
-        db.upsert_agent(agent)
-        for post in agent.get("posts", []):
-            db.upsert_post(post)
+    agents = await asyncio.to_thread(moltbook.fetch_all_tracked_agents)
+    await adb.upsert_agents_bulk(agents)
+    await adb.upsert_posts_bulk([post for agent in agents for post in agent.get("posts", [])])
+    await adb.log_event("SYNC", payload={"source": "moltbook", "synced": len(agents)})
     return {"status": "success", "synced": len(agents)}
 
 
 @app.get("/api/v1/score")
-def get_public_score(username: str):
+async def get_public_score(username: str):
     """
     PUBLIC DEVELOPER API: Get Agent Trust Score & Stats.
     Usage: GET /api/v1/score?username=agent_handle
@@ -324,24 +535,181 @@ def get_public_score(username: str):
         return {"error": "Missing 'username' query parameter."}
     
     clean_id = username.strip().replace('@', '')
-    agent = db.get_agent(clean_id)
+    score, = await adb.get_scores([clean_id])
     
-    if not agent:
+    if score["status"] == "not_found":
         return {"status": "not_found", "error": f"Agent '{clean_id}' not indexed in IQLAWD."}
         
+    score.pop("status")
+    score["api_documentation"] = "https://iqlawd.mainnet/docs"
+    return FastJSONResponse(score)
+
+
+@app.post("/api/v1/scores")
+async def get_public_scores(data: ScoresInput, request: Request, stream: bool = False):
+    """
+    PUBLIC DEVELOPER API: Trust scores for many agents in one call.
+    Usage: POST /api/v1/scores {"usernames": ["agent_a", "0x...", ...]}
+    Results keep request order; unknown handles come back as "not_found".
+    Send `Accept: application/x-ndjson` (or ?stream=true) to get one JSON
+    object per line, flushed as each chunk resolves.
+    """
+    usernames = [u.strip().replace('@', '') for u in data.usernames]
+    if not usernames:
+        return {"error": "Missing 'usernames'."}
+    if len(usernames) > SCORES_BATCH_MAX:
+        return {"error": f"Too many usernames: {len(usernames)} (max {SCORES_BATCH_MAX} per request)."}
+
+    if stream or "application/x-ndjson" in request.headers.get("accept", ""):
+        async def lines():
+            for i in range(0, len(usernames), SCORES_STREAM_CHUNK):
+                scores = await adb.get_scores(usernames[i:i + SCORES_STREAM_CHUNK], encoded=True)
+                yield "".join(score + "\n" for _, score in scores).encode()
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    scores = await adb.get_scores(usernames, encoded=True)
+    return FastJSONResponse({
+        "count": len(scores),
+        "found": sum(1 for username, _ in scores if username is not None),
+        "scores": json_array(score for _, score in scores),
+    })
+
+
+@app.get("/health")
+async def health():
+    """
+    Liveness plus internal counters: request coalescing, response cache,
+    rate limiting, live stream and DB executor/writer stats.
+    """
     return {
-        "username": agent["username"],
-        "display_name": agent.get("display_name"),
-        "trust_score": agent["trust_score"],
-        "rank": "Coming Soon", # Placeholder for global rank
-        "karma": agent.get("karma", 0),
-        "faction": agent.get("faction", "Unaligned"),
-        "risk_status": agent["risk_status"],
-        "is_active": agent["is_active"],
-        "api_documentation": "https://iqlawd.mainnet/docs"
+        "status": "ok",
+        "single_flight": {
+            "analyze": analyze_flight.metrics(),
+            "debate": debate_flight.metrics(),
+        },
+        "response_cache": response_cache.metrics(),
+        "rate_limit": rate_limiter.metrics(),
+        "stream": broker.metrics(),
+        "votes": dict(votes.stats, pending=votes.pending_count()),
+        "db": adb.stats(),
     }
 
 
+def _is_admin(request: Request) -> bool:
+    # Header only: query strings end up in access logs
+    return is_admin(request.headers.get(ADMIN_HEADER))
+
+
+def _forbidden():
+    return JSONResponse({"error": "Admin token required."}, status_code=403)
+
+
+@app.get("/debug/slow")
+async def debug_slow_requests(request: Request, route: Optional[str] = None, limit: int = 20):
+    """
+    Slowest recent requests with their span trees: DB calls, upstream HTTP
+    and scoring, each with offset and duration, plus a per-kind breakdown.
+    Filter with ?route=/analyze (route templates as listed under "routes").
+    Requires the admin token once ADMIN_TOKEN is configured.
+    """
+    if ADMIN_TOKEN and not _is_admin(request):
+        return _forbidden()
+    return {
+        "routes": slow_log.routes(),
+        "requests": slow_log.slowest(route, max(1, min(limit, 200))),
+    }
+
+
+async def _stop_profile_window(seconds: float):
+    await asyncio.sleep(seconds)
+    name = await asyncio.to_thread(profiler.stop)
+    print(f"🔬 Profile window finished: {name}")
+
+
+@app.post("/debug/profile")
+async def start_profile(request: Request, seconds: float = 30, target: str = "window"):
+    """
+    ADMIN: sample every thread for `seconds` (target=window), or profile the
+    next background sync run (target=sync). Single requests are profiled by
+    sending the admin token in the X-IQLAWD-Profile header.
+    """
+    if not _is_admin(request):
+        return _forbidden()
+    if target == "sync":
+        profiler.request_sync()
+        return {"status": "scheduled", "target": "sync"}
+    seconds = max(0.1, min(seconds, PROFILE_MAX_SECONDS))
+    if not profiler.start(f"window-{seconds:g}s"):
+        return {"status": "busy", "error": "Another profiling session is running."}
+    asyncio.create_task(_stop_profile_window(seconds))
+    return {"status": "started", "target": "window", "seconds": seconds}
+
+
+@app.get("/debug/profiles")
+async def list_profiles(request: Request):
+    """ADMIN: archived collapsed-stack profiles, newest first."""
+    if not _is_admin(request):
+        return _forbidden()
+    return {"active": profiler.active, "profiles": profiler.list()}
+
+
+@app.get("/debug/profiles/{name}")
+async def get_profile(name: str, request: Request):
+    """ADMIN: download one profile (feed it to flamegraph.pl or speedscope)."""
+    if not _is_admin(request):
+        return _forbidden()
+    path = profiler.path_for(name)
+    if path is None:
+        return JSONResponse({"error": f"Profile '{name}' not found."}, status_code=404)
+    return FileResponse(path, media_type="text/plain")
+
+
+def _runtime_metrics():
+    """Scrape-time view of counters and queue depths owned by other components."""
+    cache = response_cache.metrics()
+    limits = rate_limiter.metrics()
+    writer = db.writer.metrics()
+    stream = broker.metrics()
+    flights = {"analyze": analyze_flight.metrics(), "debate": debate_flight.metrics()}
+    return [
+        ("iqlawd_response_cache_requests_total", "counter", "Cached read endpoint lookups by result.",
+         [({"result": r}, cache[r]) for r in ("hits", "misses", "not_modified")]),
+        ("iqlawd_response_cache_hit_ratio", "gauge", "Response cache hits / lookups since start.",
+         [({}, cache["hit_ratio"])]),
+        ("iqlawd_single_flight_calls_total", "counter", "Coalesced endpoint calls by outcome.",
+         [({"flight": name, "result": r}, m[r]) for name, m in flights.items()
+          for r in ("executions", "coalesced", "fresh_hits", "errors")]),
+        ("iqlawd_single_flight_hit_ratio", "gauge", "Share of calls served without a new execution.",
+         [({"flight": name}, m["hit_ratio"]) for name, m in flights.items()]),
+        ("iqlawd_rate_limit_decisions_total", "counter", "Rate limiter decisions.",
+         [({"result": r}, limits[r]) for r in ("allowed", "limited")]),
+        ("iqlawd_queue_depth", "gauge", "Items waiting per internal queue.", [
+            ({"queue": "writer"}, writer["depth"]),
+            ({"queue": "db_read"}, adb.readers.depth()),
+            ({"queue": "db_write"}, adb.writers.depth()),
+            ({"queue": "stream"}, stream["queued"]),
+            ({"queue": "votes"}, votes.pending_count()),
+        ]),
+        ("iqlawd_writer_commands_total", "counter", "Writer thread commands by outcome.",
+         [({"result": r}, writer[r]) for r in ("committed", "failed")]),
+        ("iqlawd_writer_lock_retries_total", "counter", "Writer batches retried on lock contention.",
+         [({}, writer["lock_retries"])]),
+        ("iqlawd_stream_clients", "gauge", "Connected /stream and /ws clients.", [({}, stream["clients"])]),
+        ("iqlawd_last_sync_timestamp_seconds", "gauge", "Unix time the last background sync finished.",
+         [({}, last_sync["finished_at"])]),
+    ]
+
+
+registry.add_collector(_runtime_metrics)
+
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus scrape endpoint."""
+    return Response(content=registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 # ── Static Frontend ────────────────────────────────────────
 
 FRONTEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "frontend_src", "out")
@@ -352,28 +720,44 @@ if os.path.exists(FRONTEND_DIR):
 
 # ... existing code ...
 
-import asyncio
-
 async def background_sync_loop():
     """
     Background task to sync agents every 60 seconds.
     """
     while True:
+        started = time.perf_counter()
+        profiling = profiler.take_sync_request() and profiler.start("sync_agents")
         try:
             print("⏳ SYSTEM: Auto-Syncing Moltbook Intelligence...")
-            # Run blocking sync in thread pool
-            loop = asyncio.get_running_loop()
-            await loop.run_in_executor(None, sync_agents)
+            # Blocking work runs on the DB executor's write lane, off the read path
+            await sync_agents()
+            await adb.refresh_autocomplete()
+            await adb.refresh_rank_index()
+            await adb.rollup_metrics()
+            await adb.compact_activity()
+            SYNC_SECONDS.observe(time.perf_counter() - started, "success")
+            last_sync["finished_at"] = time.time()
             print("✅ SYSTEM: Intelligence Synced.")
         except Exception as e:
+            SYNC_SECONDS.observe(time.perf_counter() - started, "error")
             print(f"⚠️ SYSTEM ALERT: Auto-Sync Failed: {e}")
+        if profiling:
+            print(f"🔬 Sync profile saved: {await asyncio.to_thread(profiler.stop)}")
         
         await asyncio.sleep(60) # 60 seconds interval
 
 @app.on_event("startup")
 async def startup_event():
+    broker.bind(asyncio.get_running_loop())
+    votes.start()
     asyncio.create_task(background_sync_loop())
 
+@app.on_event("shutdown")
+def shutdown_event():
+    votes.stop()
+    adb.shutdown()
+    db.writer.stop()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
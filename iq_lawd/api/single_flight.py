@@ -0,0 +1,84 @@
+"""
+IQLAWD Single Flight — Coalesce identical in-flight requests
+Concurrent calls for the same key share one execution: the first caller
+runs it, everyone else awaits the same future. A successful result is
+then reused for a short freshness window, so a trending handle costs one
+upstream fetch and one write per window instead of one per click.
+Failures (exceptions or {"error": ...} payloads) are shared with callers
+already waiting but never kept for the freshness window.
+"""
+import asyncio
+import time
+import os
+from collections import OrderedDict
+
+# How long a finished scan / debate is served to repeat callers
+ANALYZE_FRESH_SECONDS = float(os.getenv("ANALYZE_FRESH_SECONDS", "15"))
+DEBATE_FRESH_SECONDS = float(os.getenv("DEBATE_FRESH_SECONDS", "30"))
+FRESH_MAX_ENTRIES = 1024
+
+
+def is_error_payload(result) -> bool:
+    """Endpoints report not-found and upstream failures as {"error": ...} dicts."""
+    return isinstance(result, dict) and "error" in result
+
+
+def normalize_key(agent_id: str) -> str:
+    """Handles are case-insensitive; EVM addresses too. Base58 (Solana) CAs keep their case."""
+    key = (agent_id or "").strip().lstrip("@")
+    if key.startswith("0x") or len(key) < 32 or " " in key:
+        return key.lower()
+    return key
+
+
+class SingleFlight:
+    def __init__(self, name: str, fresh_seconds: float, max_entries: int = FRESH_MAX_ENTRIES):
+        self.name = name
+        self.fresh_seconds = fresh_seconds
+        self.max_entries = max_entries
+        self._inflight = {}
+        self._fresh = OrderedDict()  # key -> (expires_at, result)
+        self.stats = {"calls": 0, "executions": 0, "coalesced": 0, "fresh_hits": 0, "errors": 0}
+
+    async def do(self, key, fn):
+        """Return `await fn()` for `key`, sharing it with concurrent and recent callers."""
+        self.stats["calls"] += 1
+        fresh = self._fresh.get(key)
+        if fresh is not None:
+            if fresh[0] > time.monotonic():
+                self.stats["fresh_hits"] += 1
+                return fresh[1]
+            del self._fresh[key]
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.stats["coalesced"] += 1
+        else:
+            # Run as its own task so a disconnecting first caller doesn't cancel it for everyone
+            self.stats["executions"] += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+        return await asyncio.shield(task)
+
+    def _finish(self, key, task: asyncio.Task):
+        del self._inflight[key]
+        if task.cancelled():
+            return
+        if task.exception() is not None or is_error_payload(task.result()):
+            self.stats["errors"] += 1
+            return
+        if self.fresh_seconds > 0:
+            self._fresh[key] = (time.monotonic() + self.fresh_seconds, task.result())
+            while len(self._fresh) > self.max_entries:
+                self._fresh.popitem(last=False)
+
+    def forget(self, key):
+        self._fresh.pop(key, None)
+
+    def metrics(self) -> dict:
+        stats = dict(self.stats)
+        shared = stats["coalesced"] + stats["fresh_hits"]
+        stats["hit_ratio"] = round(shared / stats["calls"], 4) if stats["calls"] else 0.0
+        stats["inflight"] = len(self._inflight)
+        return stats
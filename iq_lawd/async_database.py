@@ -0,0 +1,205 @@
+"""
+IQLAWD Async Database — Awaitable access to the shared Database
+Every call runs on a dedicated, bounded DB executor instead of the event
+loop or Starlette's general threadpool. Reads and writes get separate
+worker lanes, so a long sync or vote flush holding the SQLite write lock
+never queues in front of /listings, and every call is timed.
+"""
+import asyncio
+import os
+import queue
+import threading
+import time
+
+from iq_lawd.database import Database, get_db
+from iq_lawd.metrics import DB_CALL_ERRORS, DB_CALL_SECONDS
+from iq_lawd import tracing
+
+DB_READ_WORKERS = int(os.getenv("DB_READ_WORKERS", "4"))
+DB_WRITE_WORKERS = int(os.getenv("DB_WRITE_WORKERS", "2"))
+# Calls allowed to wait per lane before callers start awaiting a slot
+DB_QUEUE_SIZE = int(os.getenv("DB_QUEUE_SIZE", "256"))
+DB_SLOW_CALL_MS = float(os.getenv("DB_SLOW_CALL_MS", "250"))
+
+# Database methods that take the SQLite write lock; everything else is a read
+WRITE_METHODS = frozenset({
+    "log_activity", "compact_activity", "log_event", "add_oracle_message",
+    "upsert_agent", "upsert_post", "upsert_agents_bulk", "upsert_posts_bulk",
+    "rebuild_search_index", "apply_votes", "add_vote",
+    "record_metrics", "rollup_metrics",
+})
+
+
+class DBExecutor:
+    """
+    Fixed set of worker threads fed from a bounded queue. Submitters await
+    a slot before enqueueing, so overload shows up as waiting coroutines on
+    the loop rather than an unbounded backlog of blocked threads.
+    """
+
+    def __init__(self, name: str, workers: int, queue_size: int = DB_QUEUE_SIZE):
+        self.name = name
+        self.workers = workers
+        self.queue_size = queue_size
+        self._queue = queue.Queue(maxsize=queue_size + workers)
+        self._threads = []
+        self._slots = None
+        self._slots_loop = None
+        self._lock = threading.Lock()
+
+    def _start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f"db-{self.name}-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            fn, loop, future = item
+            try:
+                result = fn()
+            except BaseException as e:
+                loop.call_soon_threadsafe(_resolve, future, None, e)
+            else:
+                loop.call_soon_threadsafe(_resolve, future, result, None)
+
+    def _get_slots(self, loop) -> asyncio.Semaphore:
+        if self._slots_loop is not loop:
+            self._slots = asyncio.Semaphore(self.queue_size + self.workers)
+            self._slots_loop = loop
+        return self._slots
+
+    async def submit(self, fn):
+        if not self._threads:
+            self._start()
+        loop = asyncio.get_running_loop()
+        async with self._get_slots(loop):
+            future = loop.create_future()
+            self._queue.put_nowait((fn, loop, future))
+            return await future
+
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def shutdown(self):
+        with self._lock:
+            for _ in self._threads:
+                self._queue.put(None)
+            for thread in self._threads:
+                thread.join(timeout=5)
+            self._threads = []
+
+
+def _resolve(future, result, error):
+    if future.cancelled():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+class AsyncDatabase:
+    """
+    `await adb.get_listings_page(...)` runs `Database.get_listings_page` on
+    the read lane; methods in WRITE_METHODS go to the write lane. Use
+    `run()` for ad-hoc callables that touch the database.
+    """
+
+    def __init__(self, db: Database = None, read_workers: int = DB_READ_WORKERS,
+                 write_workers: int = DB_WRITE_WORKERS, queue_size: int = DB_QUEUE_SIZE):
+        self.db = db or get_db()
+        self.readers = DBExecutor("read", read_workers, queue_size)
+        self.writers = DBExecutor("write", write_workers, queue_size)
+        self._stats = {}  # method -> {calls, errors, total_ms, max_ms, wait_ms}
+        self._stats_lock = threading.Lock()
+
+    def _record(self, name: str, wait: float, elapsed: float, failed: bool):
+        elapsed_ms = elapsed * 1000
+        with self._stats_lock:
+            s = self._stats.get(name)
+            if s is None:
+                s = self._stats[name] = {"calls": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0, "wait_ms": 0.0}
+            s["calls"] += 1
+            s["errors"] += failed
+            s["total_ms"] += elapsed_ms
+            s["wait_ms"] += wait * 1000
+            if elapsed_ms > s["max_ms"]:
+                s["max_ms"] = elapsed_ms
+        DB_CALL_SECONDS.observe(elapsed, name)
+        if failed:
+            DB_CALL_ERRORS.inc(name)
+        if elapsed_ms >= DB_SLOW_CALL_MS:
+            print(f"🐢 Slow DB call: {name} took {elapsed_ms:.0f}ms (queued {wait * 1000:.0f}ms)")
+
+    async def run(self, fn, *args, write: bool = False, name: str = None, **kwargs):
+        """Run `fn(*args, **kwargs)` on the read (or write) lane and time it."""
+        name = name or getattr(fn, "__name__", "call")
+        enqueued = time.perf_counter()
+        # Executor threads don't inherit the request context; attach the span from here
+        parent = tracing.current()
+
+        def timed():
+            started = time.perf_counter()
+            failed = True
+            try:
+                result = fn(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                elapsed = time.perf_counter() - started
+                self._record(name, started - enqueued, elapsed, failed)
+                tracing.record(parent, name, "db", started, elapsed,
+                               queued_ms=round((started - enqueued) * 1000, 3))
+
+        executor = self.writers if write else self.readers
+        return await executor.submit(timed)
+
+    def __getattr__(self, name):
+        method = getattr(self.db, name)
+        if not callable(method):
+            raise AttributeError(f"{type(self.db).__name__}.{name} is not a method")
+        write = name in WRITE_METHODS
+
+        async def call(*args, **kwargs):
+            return await self.run(method, *args, write=write, name=name, **kwargs)
+
+        call.__name__ = name
+        return call
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            methods = {
+                name: dict(s, avg_ms=round(s["total_ms"] / s["calls"], 3) if s["calls"] else 0.0)
+                for name, s in self._stats.items()
+            }
+        return {
+            "read_queue": self.readers.depth(),
+            "write_queue": self.writers.depth(),
+            "pool": self.db.pool.stats(),
+            "writer": self.db.writer.metrics(),
+            "methods": methods,
+        }
+
+    def shutdown(self):
+        self.readers.shutdown()
+        self.writers.shutdown()
+
+
+_shared_adb = None
+_shared_adb_lock = threading.Lock()
+
+
+def get_async_db() -> AsyncDatabase:
+    """Process-wide AsyncDatabase wrapping the shared Database."""
+    global _shared_adb
+    with _shared_adb_lock:
+        if _shared_adb is None:
+            _shared_adb = AsyncDatabase()
+        return _shared_adb
@@ -0,0 +1,198 @@
+"""
+IQLAWD Autocomplete — In-process handle index
+Case-folded prefix trie over usernames, display names, X handles and
+contract addresses. Every node caches its top-K agents by trust score,
+so a keystroke lookup is a walk of len(prefix) nodes plus a cached list.
+"""
+import heapq
+import threading
+from typing import Dict, Iterable, List, Optional
+
+TOP_K = 20
+# A one-character query is one edit away from the empty prefix, i.e. everything
+FUZZY_MIN_PREFIX = 2
+
+
+def fold(text: str) -> str:
+    return (text or "").strip().lstrip("@").casefold()
+
+
+class _Node:
+    __slots__ = ("children", "terminals", "top", "dirty")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        self.terminals = set()   # usernames whose key ends exactly here
+        self.top: List[str] = []  # best TOP_K usernames in this subtree, by score desc
+        self.dirty = False
+
+
+class AutocompleteIndex:
+    """
+    Thread-safe prefix trie with per-node top-K caches.
+
+    Score increases are merged into the caches on the way down. A decrease
+    or removal marks the affected nodes dirty; they are rebuilt from their
+    children's caches on the next lookup that reaches them.
+    """
+
+    def __init__(self, top_k: int = TOP_K):
+        self.top_k = top_k
+        self.root = _Node()
+        self.agents: Dict[str, dict] = {}
+        self.keys: Dict[str, set] = {}
+        self.watermark = ""  # highest last_synced seen, for incremental refresh
+        self._lock = threading.RLock()
+
+    # ── Building ────────────────────────────────────────────────
+
+    @staticmethod
+    def keys_for(agent: dict) -> set:
+        keys = {fold(agent.get("username")), fold(agent.get("x_handle")), fold(agent.get("display_name"))}
+        # Also index each word of the display name so "molt" finds "King Molt"
+        keys.update(fold(word) for word in (agent.get("display_name") or "").split())
+        keys.discard("")
+        return keys
+
+    def _score(self, username: str) -> float:
+        return self.agents[username]["trust_score"] or 0
+
+    def _offer(self, node: _Node, username: str):
+        if node.dirty:
+            return
+        if username not in node.top:
+            if len(node.top) >= self.top_k and self._score(username) <= self._score(node.top[-1]):
+                return
+            node.top.append(username)
+        node.top.sort(key=self._score, reverse=True)
+        del node.top[self.top_k:]
+
+    def _insert_key(self, key: str, username: str):
+        node = self.root
+        self._offer(node, username)
+        for ch in key:
+            node = node.children.setdefault(ch, _Node())
+            self._offer(node, username)
+        node.terminals.add(username)
+
+    def _invalidate_key(self, key: str, username: str, remove: bool):
+        node = self.root
+        path = [node]
+        for ch in key:
+            node = node.children.get(ch)
+            if node is None:
+                return
+            path.append(node)
+        if remove:
+            node.terminals.discard(username)
+        for n in path:
+            if username in n.top:
+                n.dirty = True
+
+    def upsert(self, agent: dict):
+        username = agent.get("username")
+        if not username:
+            return
+        with self._lock:
+            previous = self.agents.get(username)
+            old_score = previous["trust_score"] if previous else None
+            self.agents[username] = {
+                "username": username,
+                "display_name": agent.get("display_name", username),
+                "avatar_url": agent.get("avatar_url", ""),
+                "trust_score": agent.get("trust_score", 0) or 0,
+            }
+            new_keys = self.keys_for(agent)
+            old_keys = self.keys.get(username, set())
+
+            for key in old_keys - new_keys:
+                self._invalidate_key(key, username, remove=True)
+            if old_score is not None and self.agents[username]["trust_score"] < old_score:
+                for key in old_keys & new_keys:
+                    self._invalidate_key(key, username, remove=False)
+            for key in new_keys:
+                self._insert_key(key, username)
+            self.keys[username] = new_keys
+
+            synced = agent.get("last_synced") or ""
+            if synced > self.watermark:
+                self.watermark = synced
+
+    def upsert_many(self, agents: Iterable[dict]):
+        for agent in agents:
+            self.upsert(agent)
+
+    # ── Lookup ──────────────────────────────────────────────────
+
+    def _clean(self, node: _Node) -> List[str]:
+        if node.dirty:
+            candidates = set(node.terminals)
+            for child in node.children.values():
+                candidates.update(self._clean(child))
+            node.top = heapq.nlargest(self.top_k, candidates, key=self._score)
+            node.dirty = False
+        return node.top
+
+    def _find(self, prefix: str) -> Optional[_Node]:
+        node = self.root
+        for ch in prefix:
+            node = node.children.get(ch)
+            if node is None:
+                return None
+        return node
+
+    def _fuzzy_nodes(self, node: _Node, prefix: str, i: int, edits: int, out: list):
+        """Collect nodes whose path is within one edit of `prefix`."""
+        if i == len(prefix):
+            out.append(node)
+            return
+        if edits:
+            child = node.children.get(prefix[i])
+            if child is not None:
+                self._fuzzy_nodes(child, prefix, i + 1, edits, out)
+            return
+        # Deletion: the query has an extra character
+        self._fuzzy_nodes(node, prefix, i + 1, 1, out)
+        for ch, child in node.children.items():
+            if ch == prefix[i]:
+                self._fuzzy_nodes(child, prefix, i + 1, 0, out)
+            else:
+                # Insertion: the query is missing `ch`
+                self._fuzzy_nodes(child, prefix, i, 1, out)
+                # Substitution: the query typed the wrong character
+                self._fuzzy_nodes(child, prefix, i + 1, 1, out)
+
+    def complete(self, prefix: str, limit: int = 10, fuzzy: bool = False) -> List[dict]:
+        """
+        Top `limit` agents by trust score with a key starting with `prefix`.
+        With `fuzzy`, prefixes within edit distance 1 also match (queries of
+        FUZZY_MIN_PREFIX characters or more only).
+        """
+        prefix = fold(prefix)
+        if not prefix or (fuzzy and len(prefix) < FUZZY_MIN_PREFIX):
+            return []
+        limit = min(limit, self.top_k)
+        with self._lock:
+            if fuzzy:
+                nodes = []
+                self._fuzzy_nodes(self.root, prefix, 0, 0, nodes)
+            else:
+                node = self._find(prefix)
+                nodes = [node] if node is not None else []
+
+            candidates = set()
+            for node in nodes:
+                candidates.update(self._clean(node))
+            best = heapq.nlargest(limit, candidates, key=self._score)
+            return [
+                {
+                    "username": a["username"],
+                    "display_name": a["display_name"],
+                    "avatar_url": a["avatar_url"],
+                    "final_score": a["trust_score"],
+                }
+                for a in (self.agents[u] for u in best)
+            ]
+
+    def __len__(self):
+        return len(self.agents)
@@ -3,379 +3,1511 @@ IQLAWD Database — Moltbook Agent Verification
 Schema designed for AI agents from Moltbook.com
 """
 import sqlite3
+import base64
+import hashlib
+import heapq
+import itertools
 import json
 import os
+import queue
+import re
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
 
+from iq_lawd.autocomplete import AutocompleteIndex
+from iq_lawd.fast_json import RawJSON, json_array, with_fields
+from iq_lawd.migrations import migrate, explain_query_plan
+from iq_lawd.rank_index import RankIndex
+from iq_lawd.write_queue import get_write_queue
+
 DB_PATH = os.getenv("DB_PATH", "iqlawd.db")
 
+# Connection pool tuning (overridable per deployment)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+DB_MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+DB_CACHE_SIZE_KB = int(os.getenv("DB_CACHE_SIZE_KB", "65536"))
+
+# Listings paging
+LISTING_MIN_SCORE = 30
+LISTINGS_PAGE_SIZE = int(os.getenv("LISTINGS_PAGE_SIZE", "100"))
+LISTINGS_MAX_PAGE_SIZE = 500
+
+# Search ranking: BM25 relevance minus trust_score * weight (lower sorts first)
+SEARCH_TRUST_WEIGHT = 0.05
+
+# Metrics history resolutions (seconds per bucket; 0 = raw samples) and retention
+RES_RAW = 0
+RES_HOUR = 3600
+RES_DAY = 86400
+METRICS_RETENTION = {
+    RES_RAW: int(os.getenv("METRICS_RAW_RETENTION", str(2 * RES_DAY))),
+    RES_HOUR: int(os.getenv("METRICS_HOURLY_RETENTION", str(30 * RES_DAY))),
+    RES_DAY: int(os.getenv("METRICS_DAILY_RETENTION", str(730 * RES_DAY))),
+}
+METRICS_MAX_POINTS = 1000
+
+# activity_log: days kept at full detail, and days of hourly rollups kept after that
+ACTIVITY_DETAIL_DAYS = int(os.getenv("ACTIVITY_DETAIL_DAYS", "14"))
+ACTIVITY_ROLLUP_DAYS = int(os.getenv("ACTIVITY_ROLLUP_DAYS", "365"))
+EVENTS_RETENTION_DAYS = int(os.getenv("EVENTS_RETENTION_DAYS", "30"))
+EVENTS_MAX_PAGE_SIZE = 500
+
+# Rows per executemany() call in bulk upserts
+BULK_CHUNK_SIZE = int(os.getenv("DB_BULK_CHUNK_SIZE", "500"))
+
+# ?since= deltas larger than this fall back to a full payload
+DELTA_MAX_ROWS = int(os.getenv("DELTA_MAX_ROWS", "1000"))
+
+
+class ConnectionPool:
+    """
+    Bounded pool of WAL-mode SQLite connections.
+    A thread that re-enters the pool gets the connection it already holds,
+    so nested calls never deadlock waiting for a second slot.
+    """
+
+    def __init__(self, db_path: str, max_size: int = DB_POOL_SIZE, timeout: float = DB_POOL_TIMEOUT):
+        self.db_path = db_path
+        # An in-memory database only exists inside its own connection
+        self.max_size = 1 if db_path == ":memory:" else max(1, max_size)
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.max_size)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._created = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=DB_BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={DB_BUSY_TIMEOUT_MS}")
+        conn.execute(f"PRAGMA mmap_size={DB_MMAP_SIZE}")
+        conn.execute(f"PRAGMA cache_size=-{DB_CACHE_SIZE_KB}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        with self._lock:
+            self._created += 1
+        return conn
+
+    def acquire(self) -> sqlite3.Connection:
+        held = getattr(self._local, "conn", None)
+        if held is not None:
+            self._local.depth += 1
+            return held
+
+        if not self._slots.acquire(timeout=self.timeout):
+            raise TimeoutError(f"Timed out waiting for a connection to {self.db_path}")
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            try:
+                conn = self._connect()
+            except Exception:
+                self._slots.release()
+                raise
+
+        self._local.conn = conn
+        self._local.depth = 1
+        return conn
+
+    def release(self, conn: sqlite3.Connection):
+        self._local.depth -= 1
+        if self._local.depth > 0:
+            return
+        self._local.conn = None
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+        self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        except Exception:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            self.release(conn)
+
+    def close_all(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+    def stats(self) -> dict:
+        return {
+            "db_path": self.db_path,
+            "max_size": self.max_size,
+            "created": self._created,
+            "idle": self._idle.qsize(),
+        }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path: str = DB_PATH) -> ConnectionPool:
+    """
+    Return the process-wide pool for a database file, so the API server,
+    social engine and scanners all reuse the same warm connections.
+    """
+    key = db_path if db_path == ":memory:" else os.path.abspath(db_path)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(db_path)
+        return pool
+
+
+def _listing_plan(template: str, column: str, direction: str, value, filter_column: str = None) -> tuple:
+    """PLAN_CHECKS entry for a listings page: score floor, optional equality filter, keyset cursor."""
+    where, params = ["trust_score >= ?"], [LISTING_MIN_SCORE]
+    if filter_column:
+        where.append(f"{filter_column} = ?")
+        params.append("UNALIGNED" if filter_column == "faction" else "VERIFIED")
+    where.append(f"({column}, username) {'<' if direction == 'DESC' else '>'} (?, ?)")
+    params.extend([value, "", 100])
+    return template.format(where=" AND ".join(where), column=column, direction=direction), tuple(params)
+
 
 class Database:
     def __init__(self, db_path=DB_PATH):
         self.db_path = db_path
+        self.pool = get_pool(db_path)
+        # All mutations go through one writer thread per database file
+        self.writer = get_write_queue(self.pool)
+        # Called with the list of agent dicts after every committed agent upsert.
+        # Listeners keep in-memory state only; writes that follow an upsert are
+        # staged inside it (see _upsert_changed) so it stays a single commit
+        self.agent_listeners = []
+        # Called with (type, data) after activity, votes and agent changes commit
+        self.event_listeners = []
+        self._autocomplete = None
+        self._autocomplete_lock = threading.Lock()
+        self._rank_index = None
+        self._rank_index_lock = threading.Lock()
         self.init_db()
 
-    def get_connection(self):
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        return conn
+    def connection(self):
+        """Borrow a pooled connection: `with self.connection() as conn:`."""
+        return self.pool.connection()
+
+    def write(self, fn):
+        """
+        Run `fn(conn)` on the writer thread and wait for its commit.
+        `fn` must not commit; the writer batches it with other pending writes.
+        """
+        return self.writer.submit(fn).result()
+
+    def add_agent_listener(self, listener):
+        self.agent_listeners.append(listener)
+
+    def _notify_agents(self, agents: list):
+        for listener in self.agent_listeners:
+            try:
+                listener(agents)
+            except Exception as e:
+                print(f"Agent listener error: {e}")
+
+    def add_event_listener(self, listener):
+        self.event_listeners.append(listener)
+
+    def _emit(self, type: str, data: dict):
+        for listener in self.event_listeners:
+            try:
+                listener(type, data)
+            except Exception as e:
+                print(f"Event listener error: {e}")
+
+    def _emit_agent_changes(self, agents: list, changed: list, created=()):
+        """
+        Publish the agents an upsert actually inserted or changed, plus one
+        CREATION per newly inserted agent (the events row itself is written
+        by the events_agent_created trigger).
+        """
+        if not changed or not self.event_listeners:
+            return
+        by_username = {a['username']: a for a in agents}
+        for username in created:
+            agent = by_username.get(username)
+            if agent is not None:
+                self._emit("CREATION", {
+                    "username": username,
+                    "display_name": agent.get('display_name', username),
+                    "payload": {"trust_score": agent.get('trust_score', 0), "faction": agent.get('faction', 'UNALIGNED')},
+                    "created_at": agent.get('created_at', ''),
+                })
+        self._emit("AGENTS", {"agents": [
+            {
+                "username": username,
+                "display_name": by_username[username].get('display_name', username),
+                "trust_score": by_username[username].get('trust_score', 0),
+                "risk_status": by_username[username].get('risk_status', 'PENDING'),
+                "faction": by_username[username].get('faction', 'UNALIGNED'),
+                "karma": by_username[username].get('karma', 0),
+            }
+            for username in changed if username in by_username
+        ]})
 
     def init_db(self):
-        conn = self.get_connection()
-        c = conn.cursor()
-
-        c.execute('''
-        CREATE TABLE IF NOT EXISTS moltbook_agents (
-            id TEXT PRIMARY KEY,
-            username TEXT UNIQUE NOT NULL,
-            display_name TEXT,
-            description TEXT,
-            karma INTEGER DEFAULT 0,
-            followers INTEGER DEFAULT 0,
-            following INTEGER DEFAULT 0,
-            avatar_url TEXT,
-            x_handle TEXT,
-            x_avatar TEXT,
-            x_bio TEXT,
-            x_followers INTEGER DEFAULT 0,
-            trust_score REAL DEFAULT 0,
-            risk_status TEXT DEFAULT 'PENDING',
-            faction TEXT DEFAULT 'UNALIGNED',
-            is_active INTEGER DEFAULT 1,
-            is_claimed INTEGER DEFAULT 0,
-            last_active TEXT,
-            created_at TEXT,
-            last_synced TEXT,
-            upvotes INTEGER DEFAULT 0,
-            downvotes INTEGER DEFAULT 0
-        )
-        ''')
-
-        c.execute('''
-        CREATE TABLE IF NOT EXISTS moltbook_posts (
-            id TEXT PRIMARY KEY,
-            agent_username TEXT NOT NULL,
-            title TEXT,
-            content TEXT,
-            upvotes INTEGER DEFAULT 0,
-            downvotes INTEGER DEFAULT 0,
-            comment_count INTEGER DEFAULT 0,
-            submolt TEXT,
-            created_at TEXT,
-            synced_at TEXT DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY(agent_username) REFERENCES moltbook_agents(username)
-        )
-        ''')
-
-        c.execute('''
-        CREATE TABLE IF NOT EXISTS votes (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            agent_username TEXT NOT NULL,
-            vote_type TEXT,
-            voter_ip TEXT,
-            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-            UNIQUE(agent_username, voter_ip)
-        )
-        ''')
-
-        c.execute('''
-        CREATE TABLE IF NOT EXISTS activity_log (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            type TEXT, -- 'CREATION' or 'SCAN'
-            username TEXT,
-            display_name TEXT,
-            created_at TEXT DEFAULT CURRENT_TIMESTAMP
-        )
-        ''')
-
-        conn.commit()
-        conn.close()
+        with self.connection() as conn:
+            migrate(conn)
+            self.report_query_plans(conn)
+
+    # ── Hot Query Shapes ────────────────────────────────────────
+
+    EVENTS_SQL = '''
+    SELECT seq, type, username, display_name, payload, created_at, ts
+    FROM events
+    WHERE seq < ?
+    ORDER BY seq DESC
+    LIMIT ?
+    '''
+
+    EVENTS_BY_TYPE_SQL = '''
+    SELECT seq, type, username, display_name, payload, created_at, ts
+    FROM events
+    WHERE type = ? AND seq < ?
+    ORDER BY seq DESC
+    LIMIT ?
+    '''
+
+    # sort key -> (column, direction); username breaks ties so keyset cursors are total
+    LISTING_SORTS = {
+        "score": ("trust_score", "DESC"),
+        "trust_score": ("trust_score", "DESC"),
+        "karma": ("karma", "DESC"),
+        "followers": ("followers", "DESC"),
+        "name": ("display_name", "ASC"),
+    }
+
+    LISTINGS_SQL = '''
+    SELECT
+        username, display_name, description, karma, followers, following,
+        avatar_url, x_handle, x_avatar, x_bio, x_followers,
+        trust_score, risk_status, faction, is_active, is_claimed,
+        last_active, created_at, upvotes, downvotes
+    FROM moltbook_agents
+    WHERE {where}
+    ORDER BY {column} {direction}, username {direction}
+    LIMIT ?
+    '''
+
+    # Row encoders: SQLite renders each row as the JSON object the API
+    # returns (same keys and values as _listing_item / _feed_item), so full
+    # pages go from the cursor to response bytes without Python dicts
+    LISTING_JSON = '''json_object(
+        'id', username, 'username', username, 'display_name', display_name,
+        'description', description, 'karma', karma, 'followers', followers,
+        'following', following, 'avatar_url', avatar_url, 'x_handle', x_handle,
+        'x_avatar', x_avatar, 'x_bio', x_bio, 'x_followers', x_followers,
+        'trust_score', trust_score, 'risk_status', risk_status, 'faction', faction,
+        'is_active', json(CASE WHEN is_active THEN 'true' ELSE 'false' END),
+        'is_claimed', json(CASE WHEN is_claimed THEN 'true' ELSE 'false' END),
+        'last_active', last_active, 'created_at', created_at,
+        'upvotes', COALESCE(upvotes, 0), 'downvotes', COALESCE(downvotes, 0)
+    )'''
+
+    LISTINGS_JSON_SQL = '''
+    SELECT username, {column}, ''' + LISTING_JSON + ''' AS item
+    FROM moltbook_agents
+    WHERE {where}
+    ORDER BY {column} {direction}, username {direction}
+    LIMIT ?
+    '''
+
+    FEED_JSON_SQL = '''
+    SELECT json_object(
+        'id', p.id, 'agent_username', p.agent_username,
+        'agent_display_name', a.display_name,
+        'agent_avatar', CASE WHEN a.x_avatar IS NULL OR a.x_avatar = '' THEN a.avatar_url ELSE a.x_avatar END,
+        'agent_karma', a.karma, 'title', p.title, 'content', p.content,
+        'upvotes', p.upvotes, 'downvotes', p.downvotes, 'comment_count', p.comment_count,
+        'submolt', p.submolt, 'created_at', p.created_at
+    ) AS item
+    FROM moltbook_posts p
+    LEFT JOIN moltbook_agents a ON p.agent_username = a.username
+    ORDER BY p.created_at DESC
+    LIMIT ?
+    '''
+
+    FEED_SQL = '''
+    SELECT p.*, a.display_name, a.avatar_url, a.x_avatar, a.karma as agent_karma
+    FROM moltbook_posts p
+    LEFT JOIN moltbook_agents a ON p.agent_username = a.username
+    ORDER BY p.created_at DESC
+    LIMIT ?
+    '''
+
+    FACTIONS_SQL = '''
+    SELECT
+        faction,
+        COUNT(*) as agent_count,
+        ROUND(AVG(trust_score), 1) as avg_trust,
+        SUM(karma) as total_karma
+    FROM moltbook_agents
+    WHERE faction IS NOT NULL AND faction != 'UNALIGNED'
+    GROUP BY faction
+    ORDER BY avg_trust DESC
+    '''
+
+    FACTIONS_JSON_SQL = '''
+    SELECT json_object(
+        'faction', faction, 'agent_count', agent_count,
+        'avg_trust', avg_trust, 'total_karma', total_karma
+    ) AS item
+    FROM (''' + FACTIONS_SQL + ''')
+    '''
+
+    FEED_BY_ID_SQL = '''
+    SELECT p.*, a.display_name, a.avatar_url, a.x_avatar, a.karma as agent_karma
+    FROM moltbook_posts p
+    LEFT JOIN moltbook_agents a ON p.agent_username = a.username
+    WHERE p.id IN ({marks})
+    '''
+
+    VOTE_FEED_SQL = '''
+    SELECT e.seq, e.username AS agent_username,
+           json_extract(e.payload, '$.vote_type') AS vote_type, e.created_at,
+           a.display_name, a.avatar_url, a.x_avatar
+    FROM events e
+    LEFT JOIN moltbook_agents a ON e.username = a.username
+    WHERE e.type = 'VOTE' AND e.seq < ?
+    ORDER BY e.seq DESC
+    LIMIT ?
+    '''
+
+    PLAN_CHECKS = {
+        "events": (EVENTS_SQL, (1 << 62, 50)),
+        "events_by_type": (EVENTS_BY_TYPE_SQL, ("SCAN", 1 << 62, 50)),
+        "listings_score": _listing_plan(LISTINGS_SQL, "trust_score", "DESC", 90.0),
+        "listings_karma": _listing_plan(LISTINGS_SQL, "karma", "DESC", 1000),
+        "listings_followers": _listing_plan(LISTINGS_SQL, "followers", "DESC", 1000),
+        "listings_name": _listing_plan(LISTINGS_SQL, "display_name", "ASC", "m"),
+        "listings_score_faction": _listing_plan(LISTINGS_SQL, "trust_score", "DESC", 90.0, "faction"),
+        "listings_karma_faction": _listing_plan(LISTINGS_SQL, "karma", "DESC", 1000, "faction"),
+        "listings_followers_faction": _listing_plan(LISTINGS_SQL, "followers", "DESC", 1000, "faction"),
+        "listings_name_faction": _listing_plan(LISTINGS_SQL, "display_name", "ASC", "m", "faction"),
+        "listings_score_risk": _listing_plan(LISTINGS_SQL, "trust_score", "DESC", 90.0, "risk_status"),
+        "listings_karma_risk": _listing_plan(LISTINGS_SQL, "karma", "DESC", 1000, "risk_status"),
+        "listings_followers_risk": _listing_plan(LISTINGS_SQL, "followers", "DESC", 1000, "risk_status"),
+        "listings_name_risk": _listing_plan(LISTINGS_SQL, "display_name", "ASC", "m", "risk_status"),
+        "feed": (FEED_SQL, (50,)),
+        "factions": (FACTIONS_SQL, ()),
+        "vote_feed": (VOTE_FEED_SQL, (1 << 62, 30)),
+    }
+
+    # ── Query Plan Checks ───────────────────────────────────────
+
+    def check_query_plans(self, conn=None) -> dict:
+        """
+        EXPLAIN QUERY PLAN for every hot query shape in PLAN_CHECKS.
+        A `full_scan` flag means an index regressed or went missing.
+        """
+        if conn is None:
+            with self.connection() as conn:
+                return self.check_query_plans(conn)
+        return {name: explain_query_plan(conn, sql, params) for name, (sql, params) in self.PLAN_CHECKS.items()}
+
+    def report_query_plans(self, conn=None):
+        for name, result in self.check_query_plans(conn).items():
+            if result["full_scan"]:
+                print(f"⚠️ DB: query '{name}' does a full table scan: {result['plan']}")
+            elif result["temp_sort"] and name.startswith("listings"):
+                # Keyset pages must walk an index in order, never sort the whole filter
+                print(f"⚠️ DB: query '{name}' sorts in a temp B-tree: {result['plan']}")
 
     # ── Activity Logging ──────────────────────────────────────────
 
+    ACTIVITY_INSERT_SQL = '''
+    INSERT INTO activity_log (type, username, display_name, created_at, ts, day)
+    VALUES (?, ?, ?, ?, ?, ?)
+    '''
+
+    @staticmethod
+    def _activity_params(type: str, username: str, display_name: str) -> tuple:
+        ts = int(time.time())
+        return (type, username, display_name, datetime.now().isoformat(), ts, ts // 86400)
+
     def log_activity(self, type: str, username: str, display_name: str):
-        conn = self.get_connection()
-        c = conn.cursor()
-        c.execute('''
-            INSERT INTO activity_log (type, username, display_name, created_at)
-            VALUES (?, ?, ?, ?)
-        ''', (type, username, display_name, datetime.now().isoformat()))
-        conn.commit()
-        conn.close()
+        params = self._activity_params(type, username, display_name)
+        self.write(lambda conn: conn.execute(self.ACTIVITY_INSERT_SQL, params))
+        self._emit(type, {"username": username, "display_name": display_name, "created_at": params[3]})
 
-    def get_recent_activity(self, limit=10):
+    def compact_activity(self, now: int = None) -> int:
         """
-        Combine creation history and scan history.
+        Fold detail rows from days older than ACTIVITY_DETAIL_DAYS into
+        per-hour counts (activity_hourly) and drop them, then expire hourly
+        counts past ACTIVITY_ROLLUP_DAYS, and events and row_changes past
+        EVENTS_RETENTION_DAYS. CREATION events are kept: there is one per
+        agent, and the backfilled ones carry the agent's original creation
+        time. Works a whole day partition at a time through the `day` index.
+        Returns the number of detail rows compacted.
         """
-        conn = self.get_connection()
-        c = conn.cursor()
-        
-        # New Creation History from moltbook_agents
-        c.execute('''
-            SELECT 'CREATION' as type, username, display_name, created_at
-            FROM moltbook_agents
-            ORDER BY created_at DESC
-            LIMIT ?
-        ''', (limit,))
-        creations = [dict(row) for row in c.fetchall()]
+        now = int(now if now is not None else time.time())
+        cutoff_day = now // 86400 - ACTIVITY_DETAIL_DAYS
 
-        # Scan History from activity_log
-        c.execute('''
-            SELECT type, username, display_name, created_at
+        def compact(conn):
+            conn.execute('''
+            INSERT INTO activity_hourly (hour, type, count)
+            SELECT ts - ts % 3600, COALESCE(type, ''), COUNT(*)
             FROM activity_log
-            WHERE type = 'SCAN'
-            ORDER BY created_at DESC
-            LIMIT ?
-        ''', (limit,))
-        scans = [dict(row) for row in c.fetchall()]
+            WHERE day < ?
+            GROUP BY ts - ts % 3600, type
+            ON CONFLICT(hour, type) DO UPDATE SET count = count + excluded.count
+            ''', (cutoff_day,))
+            compacted = conn.execute("DELETE FROM activity_log WHERE day < ?", (cutoff_day,)).rowcount
+            conn.execute(
+                "DELETE FROM activity_hourly WHERE hour < ?",
+                ((now // 86400 - ACTIVITY_ROLLUP_DAYS) * 86400,),
+            )
+            conn.execute(
+                "DELETE FROM events WHERE ts < ? AND type != 'CREATION'",
+                (now - EVENTS_RETENTION_DAYS * 86400,),
+            )
+            conn.execute("DELETE FROM row_changes WHERE ts < ?", (now - EVENTS_RETENTION_DAYS * 86400,))
+            return compacted
+
+        return self.write(compact)
 
-        # Merge and sort by date
-        combined = creations + scans
-        combined.sort(key=lambda x: x['created_at'], reverse=True)
-        conn.close()
-        return combined[:limit]
+    def get_activity_counts(self, start: int, end: int = None, type: str = None) -> list:
+        """Hourly activity counts from the compacted rollups."""
+        end = int(end if end is not None else time.time())
+        sql = "SELECT hour, type, count FROM activity_hourly WHERE hour >= ? AND hour < ?"
+        params = [start, end]
+        if type:
+            sql += " AND type = ?"
+            params.append(type)
+        with self.connection() as conn:
+            return [dict(row) for row in conn.execute(sql + " ORDER BY hour", params)]
+
+    # ── Event Stream ────────────────────────────────────────────
+
+    EVENT_INSERT_SQL = '''
+    INSERT INTO events (type, username, display_name, payload, created_at, ts)
+    VALUES (?, ?, ?, ?, ?, ?)
+    '''
+
+    @staticmethod
+    def _event_params(type: str, username: str, display_name: str, payload: dict) -> tuple:
+        return (type, username, display_name, json.dumps(payload or {}), datetime.now().isoformat(), int(time.time()))
+
+    def log_event(self, type: str, username: str = None, display_name: str = None, payload: dict = None):
+        params = self._event_params(type, username, display_name, payload)
+        seq = self.write(lambda conn: conn.execute(self.EVENT_INSERT_SQL, params).lastrowid)
+        self._emit(type, {"seq": seq, "username": username, "display_name": display_name,
+                          "payload": payload or {}, "created_at": params[4]})
+        return seq
+
+    def add_oracle_message(self, username: str, message: str, kind: str):
+        return self.log_event("ORACLE", username, None, {"message": message, "kind": kind})
+
+    @staticmethod
+    def _event_row(row) -> dict:
+        event = dict(row)
+        event["payload"] = json.loads(event["payload"] or "{}")
+        return event
+
+    def get_events(self, types=None, before: int = None, limit: int = 50) -> dict:
+        """
+        Newest-first page of events, optionally restricted to `types`.
+        Each type is read with its own (type, seq) index range scan and the
+        per-type streams are k-way merged on seq, so a page costs
+        O(len(types) * limit) no matter how large the table is.
+        Returns {"items": [...], "next_cursor": str|None}; pass the cursor back as `before`.
+        """
+        before = int(before) if before else 1 << 62
+        limit = max(1, min(int(limit), EVENTS_MAX_PAGE_SIZE))
+        with self.connection() as conn:
+            if not types:
+                rows = conn.execute(self.EVENTS_SQL, (before, limit)).fetchall()
+                items = [self._event_row(r) for r in rows]
+            else:
+                streams = [
+                    [self._event_row(r) for r in conn.execute(self.EVENTS_BY_TYPE_SQL, (t, before, limit))]
+                    for t in set(types)
+                ]
+                merged = heapq.merge(*streams, key=lambda e: e["seq"], reverse=True)
+                items = list(itertools.islice(merged, limit))
+        next_cursor = str(items[-1]["seq"]) if len(items) == limit else None
+        return {"items": items, "next_cursor": next_cursor}
+
+    def get_recent_activity(self, limit=10, before: int = None):
+        """
+        Combine creation history and scan history.
+        """
+        page = self.get_events(("CREATION", "SCAN"), before=before, limit=limit)
+        return [
+            {
+                "seq": e["seq"],
+                "type": e["type"],
+                "username": e["username"],
+                "display_name": e["display_name"],
+                "created_at": e["created_at"],
+            }
+            for e in page["items"]
+        ]
 
     # ── Agent CRUD ──────────────────────────────────────────────
 
+    # Columns compared on every upsert; id/created_at are only set on insert
+    AGENT_FIELDS = (
+        'display_name', 'description', 'karma', 'followers', 'following',
+        'avatar_url', 'x_handle', 'x_avatar', 'x_bio', 'x_followers',
+        'trust_score', 'risk_status', 'faction', 'is_active', 'is_claimed', 'last_active',
+    )
+    POST_FIELDS = (
+        'agent_username', 'title', 'content', 'upvotes', 'downvotes',
+        'comment_count', 'submolt', 'created_at',
+    )
+    # table -> (key column, diffed columns, sync timestamp column)
+    CHANGE_TRACKED = {
+        "moltbook_agents": ("username", AGENT_FIELDS, "last_synced"),
+        "moltbook_posts": ("id", POST_FIELDS, "synced_at"),
+    }
+    # Agent columns charted by the metrics history; a sample is recorded only when one moves
+    METRIC_FIELDS = frozenset(('trust_score', 'karma', 'followers'))
+
+    @staticmethod
+    def _agent_row(agent_data: dict) -> dict:
+        def sort_key(field, default):
+            # Listing sort columns are never stored NULL: (NULL, username) < (?, ?)
+            # is NULL, and keyset paging would silently skip the row
+            value = agent_data.get(field)
+            return default if value is None else value
+
+        return {
+            'id': agent_data.get('id', ''),
+            'username': agent_data['username'],
+            'display_name': sort_key('display_name', agent_data['username']),
+            'description': agent_data.get('description', ''),
+            'karma': sort_key('karma', 0),
+            'followers': sort_key('followers', 0),
+            'following': agent_data.get('following', 0),
+            'avatar_url': agent_data.get('avatar_url', ''),
+            'x_handle': agent_data.get('x_handle', ''),
+            'x_avatar': agent_data.get('x_avatar', ''),
+            'x_bio': agent_data.get('x_bio', ''),
+            'x_followers': agent_data.get('x_followers', 0),
+            'trust_score': sort_key('trust_score', 0),
+            'risk_status': agent_data.get('risk_status', 'PENDING'),
+            'faction': agent_data.get('faction', 'UNALIGNED'),
+            'is_active': 1 if agent_data.get('is_active', True) else 0,
+            'is_claimed': 1 if agent_data.get('is_claimed', False) else 0,
+            'last_active': agent_data.get('last_active', ''),
+            'created_at': agent_data.get('created_at', ''),
+        }
+
+    @staticmethod
+    def _post_row(post_data: dict) -> dict:
+        return {
+            'id': post_data['id'],
+            'agent_username': post_data['agent_username'],
+            'title': post_data.get('title', ''),
+            'content': post_data.get('content', ''),
+            'upvotes': post_data.get('upvotes', 0),
+            'downvotes': post_data.get('downvotes', 0),
+            'comment_count': post_data.get('comment_count', 0),
+            'submolt': post_data.get('submolt', 'general'),
+            'created_at': post_data.get('created_at', ''),
+        }
+
+    @staticmethod
+    def content_hash(row: dict, fields) -> str:
+        # Numbers are compared as floats so 50 and 50.0 hash the same
+        values = [
+            float(row[f]) if isinstance(row[f], (int, float)) and not isinstance(row[f], bool) else row[f]
+            for f in fields
+        ]
+        return hashlib.blake2b(json.dumps(values, default=str).encode(), digest_size=12).hexdigest()
+
+    def _hash_rows(self, table: str, rows) -> dict:
+        """key -> (row, content hash); the last row wins for duplicate keys."""
+        key, fields, _ = self.CHANGE_TRACKED[table]
+        return {row[key]: (row, self.content_hash(row, fields)) for row in rows}
+
+    def _select_in(self, conn, sql: str, keys: list, params=()):
+        """Run `sql` (with an `IN ({marks})` placeholder) over `keys` in chunks."""
+        for i in range(0, len(keys), BULK_CHUNK_SIZE):
+            chunk = keys[i:i + BULK_CHUNK_SIZE]
+            yield from conn.execute(sql.format(marks=",".join("?" * len(chunk))), list(chunk) + list(params))
+
+    def _upsert_changed(self, conn, table: str, hashed: dict, synced_at: str) -> dict:
+        """
+        Write only what changed. `hashed` comes from _hash_rows, so hashing
+        happens before the write lock is taken. Stored hashes are fetched
+        with one IN query per chunk: unchanged rows are skipped entirely,
+        new rows are inserted at version 1, and changed rows UPDATE just the
+        differing columns and bump `version`. Every insert/update is logged
+        to row_changes, and agents whose METRIC_FIELDS moved get a metrics
+        history sample. Must run on the writer thread.
+        """
+        key, fields, synced_col = self.CHANGE_TRACKED[table]
+        stored = {
+            row[0]: row[1]
+            for row in self._select_in(conn, f"SELECT {key}, content_hash FROM {table} WHERE {key} IN ({{marks}})", list(hashed))
+        }
+        stale = [k for k, (_, digest) in hashed.items() if k in stored and stored[k] != digest]
+        existing = {
+            row[key]: row
+            for row in self._select_in(
+                conn, f"SELECT {key}, version, {', '.join(fields)} FROM {table} WHERE {key} IN ({{marks}})", stale
+            )
+        }
+
+        ts = int(time.time())
+        inserts, updates, changes, moved = [], {}, [], []
+        counts = {"inserted": 0, "updated": 0, "unchanged": 0, "changed": [], "created": []}
+        for k, (row, digest) in hashed.items():
+            if k not in stored:
+                inserts.append(dict(row, version=1, content_hash=digest, **{synced_col: synced_at}))
+                changes.append((table, k, "INSERT", 1, None, ts))
+                moved.append(row)
+                continue
+            old = existing.get(k)
+            if old is None:
+                counts["unchanged"] += 1
+                continue
+            changed = tuple(f for f in fields if old[f] != row[f])
+            if not changed:
+                # Rows written before hashing existed: record the hash, no new version
+                updates.setdefault((), []).append((digest, k))
+                counts["unchanged"] += 1
+                continue
+            version = (old["version"] or 0) + 1
+            updates.setdefault(changed, []).append(
+                tuple(row[f] for f in changed) + (version, digest, synced_at, k)
+            )
+            changes.append((table, k, "UPDATE", version, json.dumps(changed), ts))
+            if self.METRIC_FIELDS.intersection(changed):
+                moved.append(row)
+
+        if inserts:
+            cols = list(inserts[0])
+            conn.executemany(
+                f"INSERT INTO {table} ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})",
+                [tuple(r[c] for c in cols) for r in inserts],
+            )
+            counts["inserted"] = len(inserts)
+        for changed, params in updates.items():
+            if changed:
+                assignments = ", ".join(f"{f} = ?" for f in changed)
+                conn.executemany(
+                    f"UPDATE {table} SET {assignments}, version = ?, content_hash = ?, {synced_col} = ? "
+                    f"WHERE {key} = ?",
+                    params,
+                )
+                counts["updated"] += len(params)
+            else:
+                conn.executemany(f"UPDATE {table} SET content_hash = ? WHERE {key} = ?", params)
+        if changes:
+            conn.executemany(
+                "INSERT INTO row_changes (table_name, row_key, op, version, fields, ts) VALUES (?, ?, ?, ?, ?, ?)",
+                changes,
+            )
+        if table == "moltbook_agents" and moved:
+            # Metrics samples commit with the upsert, never as a second write
+            conn.executemany(self.METRICS_INSERT_SQL, self._metrics_rows(moved, ts))
+        counts["changed"] = [change[1] for change in changes]
+        counts["created"] = [change[1] for change in changes if change[2] == "INSERT"]
+        return counts
+
+    def _upsert_rows(self, table: str, rows: list) -> dict:
+        synced_at = datetime.now().isoformat()
+        if not rows:
+            return {"inserted": 0, "updated": 0, "unchanged": 0, "changed": [], "created": []}
+        hashed = self._hash_rows(table, rows)
+        return self.write(lambda conn: self._upsert_changed(conn, table, hashed, synced_at))
+
     def upsert_agent(self, agent_data: dict):
-        conn = self.get_connection()
-        c = conn.cursor()
-        c.execute('''
-        INSERT INTO moltbook_agents (
-            id, username, display_name, description, karma, followers, following,
-            avatar_url, x_handle, x_avatar, x_bio, x_followers,
-            trust_score, risk_status, faction, is_active, is_claimed,
-            last_active, created_at, last_synced
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ON CONFLICT(username) DO UPDATE SET
-            display_name=excluded.display_name,
-            description=excluded.description,
-            karma=excluded.karma,
-            followers=excluded.followers,
-            following=excluded.following,
-            avatar_url=excluded.avatar_url,
-            x_handle=excluded.x_handle,
-            x_avatar=excluded.x_avatar,
-            x_bio=excluded.x_bio,
-            x_followers=excluded.x_followers,
-            trust_score=excluded.trust_score,
-            risk_status=excluded.risk_status,
-            faction=excluded.faction,
-            is_active=excluded.is_active,
-            is_claimed=excluded.is_claimed,
-            last_active=excluded.last_active,
-            last_synced=excluded.last_synced
-        ''', (
-            agent_data.get('id', ''),
-            agent_data['username'],
-            agent_data.get('display_name', agent_data['username']),
-            agent_data.get('description', ''),
-            agent_data.get('karma', 0),
-            agent_data.get('followers', 0),
-            agent_data.get('following', 0),
-            agent_data.get('avatar_url', ''),
-            agent_data.get('x_handle', ''),
-            agent_data.get('x_avatar', ''),
-            agent_data.get('x_bio', ''),
-            agent_data.get('x_followers', 0),
-            agent_data.get('trust_score', 0),
-            agent_data.get('risk_status', 'PENDING'),
-            agent_data.get('faction', 'UNALIGNED'),
-            1 if agent_data.get('is_active', True) else 0,
-            1 if agent_data.get('is_claimed', False) else 0,
-            agent_data.get('last_active', ''),
-            agent_data.get('created_at', ''),
-            datetime.now().isoformat(),
-        ))
-        conn.commit()
-        conn.close()
+        counts = self._upsert_rows("moltbook_agents", [self._agent_row(agent_data)])
+        self._notify_agents([agent_data])
+        self._emit_agent_changes([agent_data], counts["changed"], counts["created"])
 
     def upsert_post(self, post_data: dict):
-        conn = self.get_connection()
-        c = conn.cursor()
-        c.execute('''
-        INSERT OR REPLACE INTO moltbook_posts (
-            id, agent_username, title, content, upvotes, downvotes,
-            comment_count, submolt, created_at, synced_at
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            post_data['id'],
-            post_data['agent_username'],
-            post_data.get('title', ''),
-            post_data.get('content', ''),
-            post_data.get('upvotes', 0),
-            post_data.get('downvotes', 0),
-            post_data.get('comment_count', 0),
-            post_data.get('submolt', 'general'),
-            post_data.get('created_at', ''),
-            datetime.now().isoformat(),
-        ))
-        conn.commit()
-        conn.close()
+        self._upsert_rows("moltbook_posts", [self._post_row(post_data)])
+
+    def upsert_agents_bulk(self, agents) -> int:
+        """Upsert many agents in one transaction. Returns the number of rows inserted or changed."""
+        agents = list(agents)
+        counts = self._upsert_rows("moltbook_agents", [self._agent_row(a) for a in agents])
+        self._notify_agents(agents)
+        self._emit_agent_changes(agents, counts["changed"], counts["created"])
+        return counts["inserted"] + counts["updated"]
+
+    def upsert_posts_bulk(self, posts) -> int:
+        """Upsert many posts in one transaction. Returns the number of rows inserted or changed."""
+        counts = self._upsert_rows("moltbook_posts", [self._post_row(p) for p in posts])
+        return counts["inserted"] + counts["updated"]
+
+    def get_row_changes(self, table: str, key: str, limit: int = 50) -> list:
+        """Changed-fields log for one row, newest first."""
+        with self.connection() as conn:
+            rows = conn.execute('''
+                SELECT seq, op, version, fields, ts FROM row_changes
+                WHERE table_name = ? AND row_key = ?
+                ORDER BY seq DESC LIMIT ?
+            ''', (table, key, limit)).fetchall()
+        return [dict(row, fields=json.loads(row["fields"]) if row["fields"] else None) for row in rows]
+
+    def unit_of_work(self) -> "UnitOfWork":
+        """
+        Collect a request's writes and commit them together:
+
+            with db.unit_of_work() as uow:
+                uow.upsert_agent(agent)
+                uow.upsert_posts(agent["posts"])
+                uow.log_activity('SCAN', username, agent["display_name"])
+        """
+        return UnitOfWork(self)
 
     # ── Query Methods ───────────────────────────────────────────
 
-    def get_listings(self, sort_by="trust_score"):
-        conn = self.get_connection()
-        c = conn.cursor()
+    @staticmethod
+    def encode_cursor(sort_by: str, value, username: str) -> str:
+        raw = json.dumps([sort_by, value, username], separators=(",", ":")).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    @staticmethod
+    def decode_cursor(cursor: str, sort_by: str):
+        """Return (value, username) from a cursor; ValueError if it is malformed or for another sort."""
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            cursor_sort, value, username = json.loads(raw)
+        except Exception:
+            raise ValueError("Malformed cursor")
+        # Only non-NULL scalars may reach SQLite: a list or dict would be a 500,
+        # and a NULL makes the keyset predicate match nothing
+        if not isinstance(value, (str, int, float)) or not isinstance(username, str):
+            raise ValueError("Malformed cursor")
+        if cursor_sort != sort_by:
+            raise ValueError(f"Cursor was issued for sort '{cursor_sort}', not '{sort_by}'")
+        return value, username
+
+    def get_listings(self, sort_by="trust_score", **kwargs):
+        return self.get_listings_page(sort_by=sort_by, **kwargs)["items"]
+
+    def get_listings_page(self, sort_by="trust_score", limit=LISTINGS_PAGE_SIZE, cursor=None,
+                          faction=None, risk_status=None, min_score=None, max_score=None,
+                          is_claimed=None, encoded=False):
+        """
+        One keyset page of listed agents. Filters and the cursor predicate are
+        pushed into SQL and walk the per-sort index, so cost is O(limit)
+        regardless of table size. Returns {"items": [...], "next_cursor": str|None}.
+        With `encoded`, items is a RawJSON array rendered by SQLite.
+        """
+        if sort_by not in self.LISTING_SORTS:
+            sort_by = "trust_score"
+        column, direction = self.LISTING_SORTS[sort_by]
+        limit = max(1, min(int(limit), LISTINGS_MAX_PAGE_SIZE))
+
+        where, params = self._listing_filters(faction, risk_status, min_score, max_score, is_claimed)
+        if cursor:
+            value, last_username = self.decode_cursor(cursor, sort_by)
+            op = "<" if direction == "DESC" else ">"
+            where.append(f"({column}, username) {op} (?, ?)")
+            params.extend([value, last_username])
+
+        template = self.LISTINGS_JSON_SQL if encoded else self.LISTINGS_SQL
+        sql = template.format(where=" AND ".join(where), column=column, direction=direction)
+        params.append(limit + 1)
+
+        with self.connection() as conn:
+            c = conn.cursor()
+            c.execute(sql, params)
+            rows = c.fetchall()
 
-        sort_map = {
-            "score": "trust_score DESC",
-            "trust_score": "trust_score DESC",
-            "karma": "karma DESC",
-            "followers": "followers DESC",
-            "name": "display_name ASC",
+            next_cursor = None
+            if len(rows) > limit:
+                rows = rows[:limit]
+                last = rows[-1]
+                next_cursor = self.encode_cursor(sort_by, last[column], last["username"])
+
+            if encoded:
+                return {"items": self._encoded_with_ranks(rows), "next_cursor": next_cursor}
+            results = [self._listing_item(row) for row in rows]
+        return {"items": self._with_ranks(results), "next_cursor": next_cursor}
+
+    @staticmethod
+    def _listing_filters(faction=None, risk_status=None, min_score=None, max_score=None, is_claimed=None):
+        # The public listing never shows agents below the verification floor
+        where = ["trust_score >= ?"]
+        params = [max(LISTING_MIN_SCORE, min_score) if min_score is not None else LISTING_MIN_SCORE]
+        if max_score is not None:
+            where.append("trust_score <= ?")
+            params.append(max_score)
+        if faction:
+            where.append("faction = ?")
+            params.append(faction)
+        if risk_status:
+            where.append("risk_status = ?")
+            params.append(risk_status)
+        if is_claimed is not None:
+            where.append("is_claimed = ?")
+            params.append(1 if is_claimed else 0)
+        return where, params
+
+    @staticmethod
+    def _listing_item(row) -> dict:
+        return {
+            "id": row["username"],
+            "username": row["username"],
+            "display_name": row["display_name"],
+            "description": row["description"],
+            "karma": row["karma"],
+            "followers": row["followers"],
+            "following": row["following"],
+            "avatar_url": row["avatar_url"],
+            "x_handle": row["x_handle"],
+            "x_avatar": row["x_avatar"],
+            "x_bio": row["x_bio"],
+            "x_followers": row["x_followers"],
+            "trust_score": row["trust_score"],
+            "risk_status": row["risk_status"],
+            "faction": row["faction"],
+            "is_active": bool(row["is_active"]),
+            "is_claimed": bool(row["is_claimed"]),
+            "last_active": row["last_active"],
+            "created_at": row["created_at"],
+            "upvotes": row["upvotes"] or 0,
+            "downvotes": row["downvotes"] or 0,
         }
-        order = sort_map.get(sort_by, "trust_score DESC")
-
-        c.execute(f'''
-        SELECT
-            username, display_name, description, karma, followers, following,
-            avatar_url, x_handle, x_avatar, x_bio, x_followers,
-            trust_score, risk_status, faction, is_active, is_claimed,
-            last_active, created_at, upvotes, downvotes
-        FROM moltbook_agents
-        WHERE trust_score >= 30
-        ORDER BY {order}
-        ''')
-
-        results = []
-        for row in c.fetchall():
-            results.append({
-                "id": row["username"],
-                "username": row["username"],
-                "display_name": row["display_name"],
-                "description": row["description"],
-                "karma": row["karma"],
-                "followers": row["followers"],
-                "following": row["following"],
-                "avatar_url": row["avatar_url"],
-                "x_handle": row["x_handle"],
-                "x_avatar": row["x_avatar"],
-                "x_bio": row["x_bio"],
-                "x_followers": row["x_followers"],
-                "trust_score": row["trust_score"],
-                "risk_status": row["risk_status"],
-                "faction": row["faction"],
-                "is_active": bool(row["is_active"]),
-                "is_claimed": bool(row["is_claimed"]),
-                "last_active": row["last_active"],
-                "created_at": row["created_at"],
-                "upvotes": row["upvotes"] or 0,
-                "downvotes": row["downvotes"] or 0,
-            })
-        conn.close()
-        return results
-
-    def get_feed(self, limit=50):
-        conn = self.get_connection()
-        c = conn.cursor()
-        c.execute('''
-        SELECT p.*, a.display_name, a.avatar_url, a.x_avatar, a.karma as agent_karma
-        FROM moltbook_posts p
-        LEFT JOIN moltbook_agents a ON p.agent_username = a.username
-        ORDER BY p.created_at DESC
-        LIMIT ?
-        ''', (limit,))
-
-        results = []
-        for row in c.fetchall():
-            results.append({
-                "id": row["id"],
-                "agent_username": row["agent_username"],
-                "agent_display_name": row["display_name"],
-                "agent_avatar": row["x_avatar"] or row["avatar_url"],
-                "agent_karma": row["agent_karma"],
-                "title": row["title"],
-                "content": row["content"],
-                "upvotes": row["upvotes"],
-                "downvotes": row["downvotes"],
-                "comment_count": row["comment_count"],
-                "submolt": row["submolt"],
-                "created_at": row["created_at"],
-            })
-        conn.close()
-        return results
-
-    def get_factions(self):
-        conn = self.get_connection()
-        c = conn.cursor()
-        c.execute('''
-        SELECT
-            faction,
-            COUNT(*) as agent_count,
-            ROUND(AVG(trust_score), 1) as avg_trust,
-            SUM(karma) as total_karma
-        FROM moltbook_agents
-        WHERE faction IS NOT NULL AND faction != 'UNALIGNED'
-        GROUP BY faction
-        ORDER BY avg_trust DESC
-        ''')
-        results = [dict(row) for row in c.fetchall()]
-        conn.close()
-        return results
+
+    @staticmethod
+    def _feed_item(row) -> dict:
+        return {
+            "id": row["id"],
+            "agent_username": row["agent_username"],
+            "agent_display_name": row["display_name"],
+            "agent_avatar": row["x_avatar"] or row["avatar_url"],
+            "agent_karma": row["agent_karma"],
+            "title": row["title"],
+            "content": row["content"],
+            "upvotes": row["upvotes"],
+            "downvotes": row["downvotes"],
+            "comment_count": row["comment_count"],
+            "submolt": row["submolt"],
+            "created_at": row["created_at"],
+        }
+
+    def get_feed(self, limit=50, encoded=False):
+        with self.connection() as conn:
+            c = conn.cursor()
+            if encoded:
+                c.execute(self.FEED_JSON_SQL, (limit,))
+                return json_array(row[0] for row in c.fetchall())
+            c.execute(self.FEED_SQL, (limit,))
+            return [self._feed_item(row) for row in c.fetchall()]
+
+    def get_factions(self, encoded=False):
+        with self.connection() as conn:
+            c = conn.cursor()
+            if encoded:
+                c.execute(self.FACTIONS_JSON_SQL)
+                return json_array(row[0] for row in c.fetchall())
+            c.execute(self.FACTIONS_SQL)
+            results = [dict(row) for row in c.fetchall()]
+            return results
+
+    # ── Delta Sync ──────────────────────────────────────────────
+
+    def data_version(self, conn=None) -> int:
+        """
+        Monotonically increasing version of everything the dashboard shows:
+        the last row_changes seq handed out. Agent/post upserts, vote
+        recounts and new events all append there, including writes from
+        other processes. Read from sqlite_sequence so pruning never lowers it.
+        """
+        if conn is None:
+            with self.connection() as conn:
+                return self.data_version(conn)
+        row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'row_changes'").fetchone()
+        return row[0] if row else 0
+
+    def _changed_keys(self, conn, table: str, since: int):
+        """
+        Keys of `table` rows changed after version `since`, or None when the
+        delta can't be answered (changes already pruned, or too many rows)
+        and the caller should send a full payload instead.
+        """
+        version = self.data_version(conn)
+        oldest = conn.execute("SELECT MIN(seq) FROM row_changes").fetchone()[0]
+        if since > version or since < (oldest if oldest is not None else version + 1) - 1:
+            return None
+        rows = conn.execute('''
+            SELECT DISTINCT row_key FROM row_changes
+            WHERE table_name = ? AND seq > ?
+            LIMIT ?
+        ''', (table, since, DELTA_MAX_ROWS + 1)).fetchall()
+        if len(rows) > DELTA_MAX_ROWS:
+            return None
+        return [row[0] for row in rows]
+
+    @staticmethod
+    def _delta(version: int, upserted: list, deleted=(), full: bool = False) -> dict:
+        # `full`: upserted replaces the client's whole collection
+        return {"version": version, "full": full, "upserted": upserted, "deleted": list(deleted)}
+
+    def get_listings_delta(self, since: int, sort_by="trust_score", limit=LISTINGS_PAGE_SIZE,
+                           faction=None, risk_status=None, min_score=None, max_score=None,
+                           is_claimed=None) -> dict:
+        """
+        Listed agents inserted or changed after `since`. Changed agents that
+        no longer pass the filters come back in `deleted` (by username).
+        """
+        filters = dict(faction=faction, risk_status=risk_status, min_score=min_score,
+                       max_score=max_score, is_claimed=is_claimed)
+        with self.connection() as conn:
+            version = self.data_version(conn)
+            keys = self._changed_keys(conn, "moltbook_agents", int(since))
+            if keys is None:
+                page = self.get_listings_page(sort_by=sort_by, limit=limit, **filters)
+                return self._delta(version, page["items"], full=True)
+            where, params = self._listing_filters(**filters)
+            rows = self._select_in(
+                conn, f"SELECT * FROM moltbook_agents WHERE username IN ({{marks}}) AND {' AND '.join(where)}",
+                keys, params,
+            )
+            upserted = self._with_ranks([self._listing_item(row) for row in rows])
+        listed = {item["username"] for item in upserted}
+        return self._delta(version, upserted, [k for k in keys if k not in listed])
+
+    def get_feed_delta(self, since: int, limit=50) -> dict:
+        with self.connection() as conn:
+            version = self.data_version(conn)
+            keys = self._changed_keys(conn, "moltbook_posts", int(since))
+            if keys is None:
+                return self._delta(version, self.get_feed(limit), full=True)
+            upserted = [self._feed_item(row) for row in self._select_in(conn, self.FEED_BY_ID_SQL, keys)]
+        return self._delta(version, upserted)
+
+    def get_factions_delta(self, since: int) -> dict:
+        """Factions are a handful of aggregate rows: resent in full whenever any agent changed."""
+        with self.connection() as conn:
+            version = self.data_version(conn)
+            keys = self._changed_keys(conn, "moltbook_agents", int(since))
+        if keys == []:
+            return self._delta(version, [])
+        return self._delta(version, self.get_factions(), full=True)
+
+    def get_recent_activity_delta(self, since: int, limit=10) -> dict:
+        with self.connection() as conn:
+            version = self.data_version(conn)
+            keys = self._changed_keys(conn, "events", int(since))
+            if keys is None:
+                return self._delta(version, self.get_recent_activity(limit), full=True)
+            rows = self._select_in(conn, '''
+                SELECT seq, type, username, display_name, created_at FROM events
+                WHERE seq IN ({marks}) AND type IN ('CREATION', 'SCAN')
+            ''', [int(k) for k in keys])
+            upserted = sorted((dict(row) for row in rows), key=lambda e: e["seq"], reverse=True)[:limit]
+        return self._delta(version, upserted)
+
+    # column weights: username, display_name, description, x_handle
+    # Trust lifts a hit by at most weight * (highest trust score), so nothing
+    # less relevant than the limit-th best text match plus that margin can
+    # make the page: only hits inside the margin are joined and blended
+    SEARCH_SQL = '''
+    WITH m AS MATERIALIZED (
+        SELECT rowid, bm25(agents_fts, 10.0, 6.0, 1.0, 4.0) AS relevance
+        FROM agents_fts
+        WHERE agents_fts MATCH ?
+    ),
+    cutoff AS (
+        SELECT relevance + ? * MAX(COALESCE((SELECT MAX(trust_score) FROM moltbook_agents), 0), 0) AS bound
+        FROM m ORDER BY relevance LIMIT 1 OFFSET ?
+    )
+    SELECT a.username, a.display_name, a.avatar_url, a.trust_score as final_score
+    FROM m
+    JOIN moltbook_agents a ON a.rowid = m.rowid
+    WHERE m.relevance <= COALESCE((SELECT bound FROM cutoff), m.relevance)
+    ORDER BY m.relevance - COALESCE(a.trust_score, 0) * ?
+    LIMIT ?
+    '''
+
+    @staticmethod
+    def _fts_prefix_query(query: str) -> str:
+        """
+        Turn free text into an FTS5 query where every token must match.
+        Tokens of 2+ characters match as prefixes (served by the prefix index);
+        a lone character only matches a whole token.
+        """
+        tokens = re.findall(r"[^\W_]+", query.lower())
+        return " ".join(f'"{t}"*' if len(t) > 1 else f'"{t}"' for t in tokens)
 
     def search_agents(self, query: str, limit: int = 10):
-        conn = self.get_connection()
-        c = conn.cursor()
-        # Simple case-insensitive search by display_name or username
-        c.execute('''
-        SELECT 
-            username, display_name, avatar_url, trust_score as final_score
-        FROM moltbook_agents
-        WHERE username LIKE ? OR display_name LIKE ?
-        ORDER BY trust_score DESC
-        LIMIT ?
-        ''', (f"%{query}%", f"%{query}%", limit))
-        
-        results = [dict(row) for row in c.fetchall()]
-        conn.close()
-        return results
+        """
+        BM25-ranked type-ahead search over username, display name, description
+        and X handle, blended with trust score. Every text match is scored, but
+        only those close enough in relevance to reach the page are joined to
+        their agent rows, so broad prefixes stay cheap without dropping the
+        best-trusted hit.
+        """
+        match = self._fts_prefix_query(query)
+        if not match:
+            return []
+        limit = max(1, int(limit))
+        with self.connection() as conn:
+            c = conn.cursor()
+            c.execute(self.SEARCH_SQL, (match, SEARCH_TRUST_WEIGHT, limit - 1,
+                                        SEARCH_TRUST_WEIGHT, limit))
+            results = [dict(row) for row in c.fetchall()]
+            return results
+
+    def rebuild_search_index(self):
+        self.write(lambda conn: conn.execute("INSERT INTO agents_fts (agents_fts) VALUES ('rebuild')"))
+
+    # ── Autocomplete ────────────────────────────────────────────
+
+    AUTOCOMPLETE_SQL = '''
+    SELECT username, display_name, x_handle, avatar_url, trust_score, last_synced
+    FROM moltbook_agents
+    WHERE last_synced > ?
+    '''
+
+    @property
+    def autocomplete(self) -> AutocompleteIndex:
+        """
+        In-memory handle index, loaded on first use and then kept current
+        by agent upserts in this process (see refresh_autocomplete for others).
+        """
+        if self._autocomplete is None:
+            with self._autocomplete_lock:
+                if self._autocomplete is None:
+                    index = AutocompleteIndex()
+                    with self.connection() as conn:
+                        index.upsert_many(dict(row) for row in conn.execute(self.AUTOCOMPLETE_SQL, ("",)))
+                    self.add_agent_listener(index.upsert_many)
+                    self._autocomplete = index
+        return self._autocomplete
+
+    def refresh_autocomplete(self):
+        """Pick up agents written by other processes (e.g. the social engine) since the last load."""
+        if self._autocomplete is None:
+            return
+        index = self._autocomplete
+        with self.connection() as conn:
+            rows = conn.execute(self.AUTOCOMPLETE_SQL, (index.watermark,)).fetchall()
+        index.upsert_many(dict(row) for row in rows)
+
+    # ── Rank Index ──────────────────────────────────────────────
+
+    RANK_INDEX_SQL = '''
+    SELECT username, trust_score, faction, last_synced
+    FROM moltbook_agents
+    WHERE last_synced > ?
+    '''
+
+    @property
+    def rank_index(self) -> RankIndex:
+        """
+        Global / faction rank of every agent, loaded on first use and then
+        kept current by agent upserts in this process (see refresh_rank_index).
+        """
+        if self._rank_index is None:
+            with self._rank_index_lock:
+                if self._rank_index is None:
+                    index = RankIndex()
+                    with self.connection() as conn:
+                        index.upsert_many(dict(row) for row in conn.execute(self.RANK_INDEX_SQL, ("",)))
+                    self.add_agent_listener(index.upsert_many)
+                    self._rank_index = index
+        return self._rank_index
+
+    def refresh_rank_index(self):
+        """Pick up score changes written by other processes since the last load."""
+        if self._rank_index is None:
+            return
+        index = self._rank_index
+        with self.connection() as conn:
+            rows = conn.execute(self.RANK_INDEX_SQL, (index.watermark,)).fetchall()
+        index.upsert_many(dict(row) for row in rows)
+
+    def _encoded_with_ranks(self, rows) -> RawJSON:
+        index = self.rank_index
+        items = []
+        for row in rows:
+            ranks = index.lookup(row["username"]) or {}
+            items.append(with_fields(row["item"], {"rank": ranks.get("rank"), "faction_rank": ranks.get("faction_rank")}))
+        return json_array(items)
+
+    def _with_ranks(self, items: list) -> list:
+        # Ranks are as of this read; rows a delta leaves out keep the rank they were sent with
+        index = self.rank_index
+        for item in items:
+            ranks = index.lookup(item["username"]) or {}
+            item["rank"] = ranks.get("rank")
+            item["faction_rank"] = ranks.get("faction_rank")
+        return items
 
     def get_agent(self, username: str):
-        conn = self.get_connection()
-        c = conn.cursor()
-        c.execute('SELECT * FROM moltbook_agents WHERE username = ?', (username,))
-        row = c.fetchone()
-        conn.close()
-        if row:
-            return dict(row)
-        return None
+        with self.connection() as conn:
+            c = conn.cursor()
+            c.execute('SELECT * FROM moltbook_agents WHERE username = ?', (username,))
+            row = c.fetchone()
+            if row:
+                return dict(row)
+            return None
 
-    def add_vote(self, agent_username: str, vote_type: str, voter_ip: str):
-        conn = self.get_connection()
-        c = conn.cursor()
-        try:
-            c.execute('''
-            INSERT OR REPLACE INTO votes (agent_username, vote_type, voter_ip)
-            VALUES (?, ?, ?)
-            ''', (agent_username, vote_type, voter_ip))
-
-            # Update agent vote counts
-            if vote_type == "UP":
-                c.execute('UPDATE moltbook_agents SET upvotes = upvotes + 1 WHERE username = ?', (agent_username,))
+    # Requested keys arrive as one JSON array and are joined in a single
+    # statement — no per-handle round trips, no bound-variable limit
+    SCORES_SQL = '''
+    WITH keys AS (SELECT key AS pos, value AS requested FROM json_each(?))
+    SELECT k.requested, a.username, a.display_name, a.trust_score, a.risk_status,
+           a.karma, a.faction, a.is_active
+    FROM keys k
+    LEFT JOIN moltbook_agents a ON a.username = k.requested
+    ORDER BY k.pos
+    '''
+
+    SCORES_JSON_SQL = '''
+    WITH keys AS (SELECT key AS pos, value AS requested FROM json_each(?))
+    SELECT a.username, CASE WHEN a.username IS NULL
+        THEN json_object('username', k.requested, 'status', 'not_found')
+        ELSE json_object(
+            'username', a.username, 'status', 'found', 'display_name', a.display_name,
+            'trust_score', a.trust_score, 'karma', COALESCE(a.karma, 0),
+            'faction', COALESCE(NULLIF(a.faction, ''), 'Unaligned'), 'risk_status', a.risk_status,
+            'is_active', json(CASE WHEN a.is_active THEN 'true' ELSE 'false' END)
+        ) END AS item
+    FROM keys k
+    LEFT JOIN moltbook_agents a ON a.username = k.requested
+    ORDER BY k.pos
+    '''
+
+    def _score_item(self, row) -> dict:
+        if row["username"] is None:
+            return {"username": row["requested"], "status": "not_found"}
+        ranks = self.rank_index.lookup(row["username"]) or {}
+        return {
+            "username": row["username"],
+            "status": "found",
+            "display_name": row["display_name"],
+            "trust_score": row["trust_score"],
+            "rank": ranks.get("rank"),
+            "faction_rank": ranks.get("faction_rank"),
+            "percentile": ranks.get("percentile"),
+            "karma": row["karma"] or 0,
+            "faction": row["faction"] or "Unaligned",
+            "risk_status": row["risk_status"],
+            "is_active": bool(row["is_active"]),
+        }
+
+    def get_scores(self, usernames: list, encoded=False) -> list:
+        """
+        Public score records for many handles / CAs at once, in request
+        order. Unknown keys come back as {"username", "status": "not_found"}.
+        With `encoded`, returns (username, record) pairs where the record is
+        a JSON object string rendered by SQLite and username is None for
+        keys that were not found.
+        """
+        if not usernames:
+            return []
+        keys = (json.dumps(list(usernames)),)
+        with self.connection() as conn:
+            if encoded:
+                rows = conn.execute(self.SCORES_JSON_SQL, keys).fetchall()
             else:
-                c.execute('UPDATE moltbook_agents SET downvotes = downvotes + 1 WHERE username = ?', (agent_username,))
+                rows = conn.execute(self.SCORES_SQL, keys).fetchall()
+        if not encoded:
+            return [self._score_item(row) for row in rows]
+        lookup = self.rank_index.lookup
+        scores = []
+        for username, item in rows:
+            if username is not None:
+                ranks = lookup(username) or {}
+                item = with_fields(item, {k: ranks.get(k) for k in ("rank", "faction_rank", "percentile")})
+            scores.append((username, item))
+        return scores
+
+    VOTE_UPSERT_SQL = '''
+    INSERT INTO votes (agent_username, vote_type, voter_ip, created_at)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT(agent_username, voter_ip) DO UPDATE SET
+        vote_type=excluded.vote_type,
+        created_at=excluded.created_at
+    WHERE votes.vote_type IS NOT excluded.vote_type
+    '''
+
+    # Counters are derived from the deduplicated votes table, never incremented
+    VOTE_RECOUNT_SQL = '''
+    UPDATE moltbook_agents SET
+        upvotes = (SELECT COUNT(*) FROM votes WHERE agent_username = ? AND vote_type = 'UP'),
+        downvotes = (SELECT COUNT(*) FROM votes WHERE agent_username = ? AND vote_type = 'DOWN')
+    WHERE username = ?
+    '''
 
-            conn.commit()
-            conn.close()
+    def apply_votes(self, votes: list) -> set:
+        """
+        Write a batch of (agent_username, vote_type, voter_ip, created_at)
+        votes in one transaction and recount each touched agent once.
+        A re-vote by the same voter replaces their previous vote; repeating
+        the same vote writes nothing, so it adds no event and no stream push.
+        Returns the set of agents whose counters were refreshed.
+        """
+        applied = []
+
+        def apply(conn):
+            applied.clear()  # the writer may retry the whole batch
+            applied.extend(v for v in votes if conn.execute(self.VOTE_UPSERT_SQL, v).rowcount)
+            touched = {v[0] for v in applied}
+            if not touched:
+                return {}
+            conn.executemany(self.VOTE_RECOUNT_SQL, [(a, a, a) for a in touched])
+            if not self.event_listeners:
+                return {}
+            return {
+                row[0]: {"upvotes": row[1], "downvotes": row[2]}
+                for row in self._select_in(
+                    conn, "SELECT username, upvotes, downvotes FROM moltbook_agents WHERE username IN ({marks})",
+                    list(touched),
+                )
+            }
+
+        counters = self.write(apply)
+        if counters:
+            self._emit("VOTE", {
+                "votes": [{"agent_username": v[0], "vote_type": v[1], "created_at": v[3]} for v in applied],
+                "counters": counters,
+            })
+        return {v[0] for v in applied}
+
+    def add_vote(self, agent_username: str, vote_type: str, voter_ip: str):
+        try:
+            created_at = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+            vote_type = "UP" if (vote_type or "").upper() == "UP" else "DOWN"
+            self.apply_votes([(agent_username, vote_type, voter_ip, created_at)])
             return True
         except Exception as e:
             print(f"Vote error: {e}")
-            conn.close()
             return False
 
-    def get_activity_feed(self):
-        conn = self.get_connection()
-        c = conn.cursor()
-        c.execute('''
-        SELECT v.agent_username, v.vote_type, v.created_at,
-               a.display_name, a.avatar_url, a.x_avatar
-        FROM votes v
-        LEFT JOIN moltbook_agents a ON v.agent_username = a.username
-        ORDER BY v.created_at DESC
-        LIMIT 30
-        ''')
-        results = [dict(row) for row in c.fetchall()]
-        conn.close()
-        return results
+    def get_activity_feed(self, limit: int = 30, before: int = None):
+        limit = max(1, min(int(limit), EVENTS_MAX_PAGE_SIZE))
+        with self.connection() as conn:
+            c = conn.cursor()
+            c.execute(self.VOTE_FEED_SQL, (int(before) if before else 1 << 62, limit))
+            results = [dict(row) for row in c.fetchall()]
+            return results
+
+    # ── Metrics History ─────────────────────────────────────────
+
+    METRICS_INSERT_SQL = '''
+    INSERT OR REPLACE INTO agent_metrics_history (
+        username, resolution, ts, trust_score, trust_min, trust_max,
+        karma, followers, samples
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    '''
+
+    @staticmethod
+    def _metrics_rows(agents, ts: int) -> list:
+        return [
+            (a['username'], RES_RAW, ts, a.get('trust_score', 0) or 0,
+             a.get('trust_score', 0) or 0, a.get('trust_score', 0) or 0,
+             a.get('karma', 0) or 0, a.get('followers', 0) or 0, 1)
+            for a in agents if a.get('username')
+        ]
+
+    def record_metrics(self, agents: list, ts: int = None):
+        """
+        Append a raw trust/karma/followers sample for each agent. Agent
+        upserts record their own samples; this is for backfills and imports.
+        """
+        rows = self._metrics_rows(agents, int(ts if ts is not None else time.time()))
+        if not rows:
+            return
+        self.write(lambda conn: conn.executemany(self.METRICS_INSERT_SQL, rows))
+
+    def rollup_metrics(self, now: int = None) -> dict:
+        """
+        Downsample raw samples into hourly buckets and hourly into daily,
+        then apply retention. Only fully closed buckets are rolled up, and
+        each level resumes from its own watermark, so this is cheap to call
+        every sync cycle.
+        """
+        now = int(now if now is not None else time.time())
+        rolled = {}
+
+        def rollup(conn):
+            for source, target in ((RES_RAW, RES_HOUR), (RES_HOUR, RES_DAY)):
+                row = conn.execute(
+                    "SELECT rolled_until FROM metrics_rollup_state WHERE resolution = ?", (target,)
+                ).fetchone()
+                start = row[0] if row else 0
+                end = now - now % target
+                if end <= start:
+                    continue
+                # Weighted by sample count so daily averages stay exact
+                cur = conn.execute('''
+                INSERT OR REPLACE INTO agent_metrics_history (
+                    username, resolution, ts, trust_score, trust_min, trust_max,
+                    karma, followers, samples
+                )
+                SELECT username, ?, ts - ts % ?,
+                       SUM(trust_score * samples) / SUM(samples),
+                       MIN(trust_min), MAX(trust_max),
+                       MAX(karma), MAX(followers), SUM(samples)
+                FROM agent_metrics_history
+                WHERE resolution = ? AND ts >= ? AND ts < ?
+                GROUP BY username, ts - ts % ?
+                ''', (target, target, source, start, end, target))
+                rolled[target] = cur.rowcount
+                conn.execute(
+                    "INSERT OR REPLACE INTO metrics_rollup_state (resolution, rolled_until) VALUES (?, ?)",
+                    (target, end),
+                )
+
+            for resolution, keep in METRICS_RETENTION.items():
+                conn.execute(
+                    "DELETE FROM agent_metrics_history WHERE resolution = ? AND ts < ?",
+                    (resolution, now - keep),
+                )
+
+        self.write(rollup)
+        return rolled
+
+    def get_metrics_history(self, username: str, start: int = None, end: int = None,
+                            resolution: int = None, limit: int = METRICS_MAX_POINTS):
+        """
+        Time series for one agent, oldest first. When `resolution` is not
+        given, the finest level whose retention covers `start` is used, so a
+        long range reads rollups instead of raw rows. Samples are only
+        recorded when a value moves, so a gap between points means "unchanged".
+        """
+        end = int(end if end is not None else time.time())
+        start = int(start if start is not None else end - 7 * RES_DAY)
+        if resolution is None:
+            age = time.time() - start
+            resolution = next(
+                (res for res in (RES_RAW, RES_HOUR) if age <= METRICS_RETENTION[res]),
+                RES_DAY,
+            )
+        with self.connection() as conn:
+            rows = conn.execute('''
+            SELECT ts, trust_score, trust_min, trust_max, karma, followers, samples
+            FROM agent_metrics_history
+            WHERE username = ? AND resolution = ? AND ts >= ? AND ts <= ?
+            ORDER BY ts DESC
+            LIMIT ?
+            ''', (username, resolution, start, end, limit)).fetchall()
+        return [dict(row) for row in reversed(rows)]
+
+    def get_trust_score_series(self, username: str, **kwargs) -> list:
+        """Plain list of trust scores, oldest first — the shape RiskMonitor expects."""
+        return [p["trust_score"] for p in self.get_metrics_history(username, **kwargs)]
+
+
+class UnitOfWork:
+    """
+    Writes staged here run as one command on the writer thread: one
+    connection, one transaction, one commit. Leaving the `with` block
+    normally commits; an exception (in the block or in any staged write)
+    leaves the database untouched. Agent listeners fire after the commit.
+    """
+
+    def __init__(self, db: Database):
+        self.db = db
+        self.synced_at = datetime.now().isoformat()
+        self._commands = []
+        self._agents = []
+        self._activity = []
+        self._changed_agents = []
+        self._created_agents = []
+        self.committed = False
+
+    def add(self, fn):
+        """Stage an arbitrary `fn(conn)` write; it must not commit."""
+        self._commands.append(fn)
+
+    def upsert_agent(self, agent_data: dict):
+        hashed = self.db._hash_rows("moltbook_agents", [self.db._agent_row(agent_data)])
+
+        def apply(conn):
+            counts = self.db._upsert_changed(conn, "moltbook_agents", hashed, self.synced_at)
+            self._changed_agents.extend(counts["changed"])
+            self._created_agents.extend(counts["created"])
+
+        self.add(apply)
+        self._agents.append(agent_data)
+
+    def upsert_posts(self, posts):
+        hashed = self.db._hash_rows("moltbook_posts", [self.db._post_row(p) for p in posts])
+        if hashed:
+            self.add(lambda conn: self.db._upsert_changed(conn, "moltbook_posts", hashed, self.synced_at))
+
+    def log_activity(self, type: str, username: str, display_name: str):
+        params = self.db._activity_params(type, username, display_name)
+        self.add(lambda conn: conn.execute(self.db.ACTIVITY_INSERT_SQL, params))
+        self._activity.append((type, {"username": username, "display_name": display_name, "created_at": params[3]}))
+
+    def log_event(self, type: str, username: str = None, display_name: str = None, payload: dict = None):
+        params = self.db._event_params(type, username, display_name, payload)
+        self.add(lambda conn: conn.execute(self.db.EVENT_INSERT_SQL, params))
+        self._activity.append((type, {"username": username, "display_name": display_name,
+                                      "payload": payload or {}, "created_at": params[4]}))
+
+    def _apply(self, conn):
+        self._changed_agents = []  # the writer may retry the whole batch
+        self._created_agents = []
+        for fn in self._commands:
+            fn(conn)
+        return len(self._commands)
+
+    def commit(self) -> int:
+        """Write everything staged in a single transaction. Returns the number of writes."""
+        if self.committed:
+            return 0
+        count = self.db.write(self._apply) if self._commands else 0
+        self.committed = True
+        if self._agents:
+            self.db._notify_agents(self._agents)
+            self.db._emit_agent_changes(self._agents, self._changed_agents, self._created_agents)
+        for type, data in self._activity:
+            self.db._emit(type, data)
+        return count
+
+    def rollback(self):
+        self._commands = []
+        self._agents = []
+        self._activity = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+        return False
+
+
+_shared_db = None
+_shared_db_lock = threading.Lock()
+
+
+def get_db() -> Database:
+    """Process-wide Database instance backed by the shared connection pool."""
+    global _shared_db
+    with _shared_db_lock:
+        if _shared_db is None:
+            _shared_db = Database()
+        return _shared_db
+
+
+def __getattr__(name):
+    # `from iq_lawd.database import db` resolves lazily to the shared instance
+    if name == "db":
+        return get_db()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
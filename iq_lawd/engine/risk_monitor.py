@@ -1,3 +1,5 @@
+from iq_lawd.tracing import traced
+
 class RiskMonitor:
     def __init__(self):
         pass
@@ -31,6 +33,7 @@ class RiskMonitor:
             return "SUSPICIOUS_PERFECTION"
         return "NORMAL"
 
+    @traced("scoring")
     def monitor_trust_decay(self, trust_score_history):
         """
         Mendeteksi tren penurunan trust score.
@@ -1,6 +1,7 @@
 from iq_lawd.config import config
 from iq_lawd.config import config
 import statistics
+from iq_lawd.tracing import traced
 
 class TrustScoreCalculator:
     def __init__(self):
@@ -64,6 +65,7 @@ class TrustScoreCalculator:
         # Mendeteksi drawdown terbesar, lalu melihat apakah equity kembali ke ATH
         return 75.0 # Default optimistis untuk saat ini
 
+    @traced("scoring")
     def compute_total_trust_score(self, agent_data):
         """
         Menghitung Weighted Average dari semua sub-metrik.
@@ -0,0 +1,56 @@
+"""
+IQLAWD Fast JSON — orjson-backed encoding with pre-encoded fragments
+`dumps()` is the one JSON encoder for API bodies. Lists that SQLite has
+already rendered as JSON (see the row encoders in database.py) travel as
+RawJSON and are spliced into the body verbatim, so a listing page never
+exists as Python dicts at all. Falls back to the stdlib encoder when
+orjson is missing.
+"""
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class RawJSON:
+    """Already-encoded JSON text; dumps() copies it into the output unchanged."""
+
+    __slots__ = ("text",)
+
+    def __init__(self, text: str):
+        self.text = text
+
+    def __repr__(self):
+        return f"RawJSON({self.text[:60]!r})"
+
+
+def json_array(fragments) -> RawJSON:
+    """A JSON array from already-encoded element texts."""
+    return RawJSON("[" + ",".join(fragments) + "]")
+
+
+def with_fields(fragment: str, fields: dict) -> str:
+    """Append `fields` to an encoded JSON object: '{"a":1}' -> '{"a":1,"b":2}'."""
+    extra = _dumps(fields).decode()
+    if fragment == "{}":
+        return extra
+    return fragment[:-1] + "," + extra[1:]
+
+
+if orjson is not None:
+    def _dumps(obj) -> bytes:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS)
+else:
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj, separators=(",", ":"), default=str).encode()
+
+
+def dumps(obj) -> bytes:
+    """Compact JSON bytes. RawJSON is spliced as-is at the top level or as a top-level dict value."""
+    if isinstance(obj, RawJSON):
+        return obj.text.encode()
+    if isinstance(obj, dict) and any(isinstance(v, RawJSON) for v in obj.values()):
+        return b"{" + b",".join(_dumps(str(k)) + b":" + dumps(v) for k, v in obj.items()) + b"}"
+    return _dumps(obj)
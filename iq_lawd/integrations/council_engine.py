@@ -1,4 +1,5 @@
 import random
+from iq_lawd.tracing import traced
 
 class CouncilEngine:
     def __init__(self):
@@ -63,6 +64,7 @@ class CouncilEngine:
             }
         }
 
+    @traced("scoring")
     def generate_debate(self, agent_data):
         score = agent_data.get("trust_score", 50)
         category = "low" if score < 40 else ("high" if score > 75 else "mid")
@@ -1,10 +1,12 @@
 import requests
 import time
+from iq_lawd.tracing import traced
 
 class DexScreenerClient:
     def __init__(self):
         self.base_url = "https://api.dexscreener.com/latest/dex/tokens"
 
+    @traced("client")
     def get_token_data(self, token_address):
         """
         Fetch token data from DexScreener by contract address.
@@ -7,6 +7,7 @@ import time
 import math
 from typing import Optional, Dict, List
 from datetime import datetime
+from iq_lawd.tracing import traced
 
 
 # Known Moltbook AI agents to track
@@ -58,6 +59,7 @@ class MoltbookAPIClient:
         if api_key:
             self.session.headers["Authorization"] = f"Bearer {api_key}"
 
+    @traced("client")
     def fetch_agent(self, username: str) -> Optional[Dict]:
         """
         Fetch a single agent profile from Moltbook API.
@@ -152,6 +154,7 @@ class MoltbookAPIClient:
 
         return agents
 
+    @traced("scoring")
     def _calculate_trust_score(self, agent: dict, posts: list) -> float:
         """
         Calculate trust score based on Moltbook metrics.
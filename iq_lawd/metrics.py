@@ -0,0 +1,240 @@
+"""
+IQLAWD Metrics — Prometheus-format counters and latency histograms
+Fixed-bucket histograms and counters kept in plain dicts: recording is a
+bisect and two increments under a lock, and nothing is formatted until
+/metrics is scraped. Point-in-time values (queue depths, cache counters
+owned by other components) are read by collectors at scrape time.
+Outbound HTTP is timed per provider by wrapping the shared transports.
+"""
+import bisect
+import functools
+import threading
+import time
+from typing import Callable, Dict, List, Tuple
+from urllib.parse import urlsplit
+
+from iq_lawd import tracing
+
+# Seconds; spans a cached read (~1ms) to a slow upstream call (~10s)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SYNC_BUCKETS = (1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0)
+
+# Host suffix -> provider label for upstream timings
+UPSTREAM_PROVIDERS = (
+    ("moltbook.com", "moltbook"),
+    ("dexscreener.com", "dexscreener"),
+    ("geckoterminal.com", "geckoterminal"),
+    ("alchemy.com", "alchemy"),
+    ("openai.com", "openai"),
+)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        lines.extend(f"{self.name}{_labels(self.labelnames, k)} {_number(v)}" for k, v in values)
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[tuple, list] = {}  # labels -> [per-bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[i] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((k, list(v)) for k, v in self._series.items())
+        for labels, counts in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="%s"' % _number(bound)
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(counts[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+# A collector returns [(name, type, help, [(labels dict, value), ...]), ...]
+Collector = Callable[[], List[Tuple[str, str, str, list]]]
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        self.collectors: List[Collector] = []
+
+    def counter(self, name: str, help: str, labelnames: tuple = ()) -> Counter:
+        metric = Counter(name, help, labelnames)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        metric = Histogram(name, help, labelnames, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Collector):
+        self.collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        for collector in self.collectors:
+            try:
+                families = collector()
+            except Exception as e:
+                print(f"Metrics collector error: {e}")
+                continue
+            for name, type, help, samples in families:
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {type}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_labels(tuple(labels), tuple(labels.values()))} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+HTTP_REQUEST_SECONDS = registry.histogram(
+    "iqlawd_http_request_duration_seconds", "API request latency by route and status.",
+    ("route", "method", "status"),
+)
+DB_CALL_SECONDS = registry.histogram(
+    "iqlawd_db_call_duration_seconds", "Database method execution time on the DB executor.", ("method",),
+)
+DB_CALL_ERRORS = registry.counter(
+    "iqlawd_db_call_errors_total", "Database method calls that raised.", ("method",),
+)
+UPSTREAM_SECONDS = registry.histogram(
+    "iqlawd_upstream_request_duration_seconds", "Outbound HTTP latency by provider and status.",
+    ("provider", "status"),
+)
+SYNC_SECONDS = registry.histogram(
+    "iqlawd_sync_duration_seconds", "Background Moltbook sync duration.", ("result",), buckets=SYNC_BUCKETS,
+)
+
+
+# ── Upstream HTTP ───────────────────────────────────────────
+
+def upstream_provider(url) -> str:
+    host = urlsplit(str(url)).hostname or ""
+    for suffix, provider in UPSTREAM_PROVIDERS:
+        if host == suffix or host.endswith("." + suffix):
+            return provider
+    return "other"
+
+
+def _timed_send(send, url_of):
+    @functools.wraps(send)
+    def timed(self, request, *args, **kwargs):
+        started = time.perf_counter()
+        status = "error"
+        try:
+            response = send(self, request, *args, **kwargs)
+            status = str(response.status_code)
+            return response
+        finally:
+            elapsed = time.perf_counter() - started
+            provider = upstream_provider(url_of(request))
+            UPSTREAM_SECONDS.observe(elapsed, provider, status)
+            tracing.record(tracing.current(), provider, "http", started, elapsed, status=status)
+
+    timed._iqlawd_timed = True
+    return timed
+
+
+def instrument_http_clients():
+    """
+    Time every outbound call made through `requests` (Moltbook, DexScreener,
+    GeckoTerminal, Alchemy) and `httpx` (the OpenAI SDK). Idempotent.
+    """
+    try:
+        import requests
+        if not getattr(requests.Session.send, "_iqlawd_timed", False):
+            requests.Session.send = _timed_send(requests.Session.send, lambda r: r.url)
+    except ImportError:
+        pass
+    try:
+        import httpx
+        if not getattr(httpx.Client.send, "_iqlawd_timed", False):
+            httpx.Client.send = _timed_send(httpx.Client.send, lambda r: r.url)
+    except ImportError:
+        pass
+
+
+# ── API Requests ────────────────────────────────────────────
+
+class RequestMetricsMiddleware:
+    """
+    ASGI middleware timing every HTTP request into HTTP_REQUEST_SECONDS.
+    The route label is the matched route template ("/agents/{username}/history"),
+    never the raw path, so label cardinality stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, route, scope["method"], str(status))
@@ -0,0 +1,468 @@
+"""
+IQLAWD Schema Migrations
+Ordered, versioned schema changes applied on startup.
+
+Each migration runs in its own IMMEDIATE transaction and bumps
+`schema_version`, so a crash mid-way never leaves a half-applied step.
+Index builds are shipped one per migration: the write lock is held only
+for the duration of a single build, and WAL readers keep serving.
+"""
+import sqlite3
+from datetime import datetime
+from typing import List, NamedTuple, Tuple
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    statements: Tuple[str, ...]
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "base_tables", (
+        '''
+        CREATE TABLE IF NOT EXISTS moltbook_agents (
+            id TEXT PRIMARY KEY,
+            username TEXT UNIQUE NOT NULL,
+            display_name TEXT,
+            description TEXT,
+            karma INTEGER DEFAULT 0,
+            followers INTEGER DEFAULT 0,
+            following INTEGER DEFAULT 0,
+            avatar_url TEXT,
+            x_handle TEXT,
+            x_avatar TEXT,
+            x_bio TEXT,
+            x_followers INTEGER DEFAULT 0,
+            trust_score REAL DEFAULT 0,
+            risk_status TEXT DEFAULT 'PENDING',
+            faction TEXT DEFAULT 'UNALIGNED',
+            is_active INTEGER DEFAULT 1,
+            is_claimed INTEGER DEFAULT 0,
+            last_active TEXT,
+            created_at TEXT,
+            last_synced TEXT,
+            upvotes INTEGER DEFAULT 0,
+            downvotes INTEGER DEFAULT 0
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS moltbook_posts (
+            id TEXT PRIMARY KEY,
+            agent_username TEXT NOT NULL,
+            title TEXT,
+            content TEXT,
+            upvotes INTEGER DEFAULT 0,
+            downvotes INTEGER DEFAULT 0,
+            comment_count INTEGER DEFAULT 0,
+            submolt TEXT,
+            created_at TEXT,
+            synced_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY(agent_username) REFERENCES moltbook_agents(username)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS votes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            agent_username TEXT NOT NULL,
+            vote_type TEXT,
+            voter_ip TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(agent_username, voter_ip)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS activity_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            type TEXT, -- 'CREATION' or 'SCAN'
+            username TEXT,
+            display_name TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+    )),
+
+    # ── Listings: one index per sort key, username as tie-breaker ──
+    Migration(2, "idx_agents_trust_score", (
+        "CREATE INDEX IF NOT EXISTS idx_agents_trust_score ON moltbook_agents(trust_score, username)",
+    )),
+    Migration(3, "idx_agents_karma", (
+        "CREATE INDEX IF NOT EXISTS idx_agents_karma ON moltbook_agents(karma, username)",
+    )),
+    Migration(4, "idx_agents_followers", (
+        "CREATE INDEX IF NOT EXISTS idx_agents_followers ON moltbook_agents(followers, username)",
+    )),
+    Migration(5, "idx_agents_display_name", (
+        "CREATE INDEX IF NOT EXISTS idx_agents_display_name ON moltbook_agents(display_name, username)",
+    )),
+
+    # ── Covering indexes for the activity / feed / faction queries ──
+    Migration(6, "idx_agents_created_at", (
+        "CREATE INDEX IF NOT EXISTS idx_agents_created_at ON moltbook_agents(created_at, username, display_name)",
+    )),
+    Migration(7, "idx_agents_faction", (
+        "CREATE INDEX IF NOT EXISTS idx_agents_faction ON moltbook_agents(faction, trust_score, karma)",
+    )),
+    Migration(8, "idx_activity_type_created", (
+        "CREATE INDEX IF NOT EXISTS idx_activity_type_created ON activity_log(type, created_at, username, display_name)",
+    )),
+    Migration(9, "idx_posts_created_at", (
+        "CREATE INDEX IF NOT EXISTS idx_posts_created_at ON moltbook_posts(created_at)",
+    )),
+    Migration(10, "idx_votes_created_at", (
+        "CREATE INDEX IF NOT EXISTS idx_votes_created_at ON votes(created_at)",
+    )),
+
+    # ── Full-text search over agents (external content, kept in sync by triggers) ──
+    # Implicit rowids can move on VACUUM; run Database.rebuild_search_index() afterwards.
+    Migration(11, "agents_fts", (
+        '''
+        CREATE VIRTUAL TABLE IF NOT EXISTS agents_fts USING fts5(
+            username, display_name, description, x_handle,
+            content='moltbook_agents', content_rowid='rowid',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        )
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS agents_fts_ai AFTER INSERT ON moltbook_agents BEGIN
+            INSERT INTO agents_fts (rowid, username, display_name, description, x_handle)
+            VALUES (new.rowid, new.username, new.display_name, new.description, new.x_handle);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS agents_fts_ad AFTER DELETE ON moltbook_agents BEGIN
+            INSERT INTO agents_fts (agents_fts, rowid, username, display_name, description, x_handle)
+            VALUES ('delete', old.rowid, old.username, old.display_name, old.description, old.x_handle);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS agents_fts_au AFTER UPDATE OF username, display_name, description, x_handle
+        ON moltbook_agents
+        WHEN old.username IS NOT new.username
+          OR old.display_name IS NOT new.display_name
+          OR old.description IS NOT new.description
+          OR old.x_handle IS NOT new.x_handle
+        BEGIN
+            INSERT INTO agents_fts (agents_fts, rowid, username, display_name, description, x_handle)
+            VALUES ('delete', old.rowid, old.username, old.display_name, old.description, old.x_handle);
+            INSERT INTO agents_fts (rowid, username, display_name, description, x_handle)
+            VALUES (new.rowid, new.username, new.display_name, new.description, new.x_handle);
+        END
+        ''',
+        "INSERT INTO agents_fts (agents_fts) VALUES ('rebuild')",
+    )),
+
+    # Incremental refresh of the in-memory autocomplete index
+    Migration(12, "idx_agents_last_synced", (
+        "CREATE INDEX IF NOT EXISTS idx_agents_last_synced ON moltbook_agents(last_synced)",
+    )),
+
+    # ── Append-only metrics history (raw -> hourly -> daily rollups) ──
+    Migration(13, "agent_metrics_history", (
+        '''
+        CREATE TABLE IF NOT EXISTS agent_metrics_history (
+            username TEXT NOT NULL,
+            resolution INTEGER NOT NULL, -- seconds per bucket, 0 = raw sample
+            ts INTEGER NOT NULL,         -- unix seconds (bucket start for rollups)
+            trust_score REAL,
+            trust_min REAL,
+            trust_max REAL,
+            karma INTEGER,
+            followers INTEGER,
+            samples INTEGER NOT NULL DEFAULT 1,
+            PRIMARY KEY (username, resolution, ts)
+        ) WITHOUT ROWID
+        ''',
+        "CREATE INDEX IF NOT EXISTS idx_metrics_resolution_ts ON agent_metrics_history(resolution, ts)",
+        '''
+        CREATE TABLE IF NOT EXISTS metrics_rollup_state (
+            resolution INTEGER PRIMARY KEY,
+            rolled_until INTEGER NOT NULL
+        )
+        ''',
+    )),
+
+    # ── Vote counters derived from deduplicated votes ──
+    Migration(14, "idx_votes_agent_type", (
+        "CREATE INDEX IF NOT EXISTS idx_votes_agent_type ON votes(agent_username, vote_type)",
+        # Earlier builds incremented on every re-vote; recount once from the votes table
+        '''
+        UPDATE moltbook_agents SET
+            upvotes = (SELECT COUNT(*) FROM votes WHERE agent_username = moltbook_agents.username AND vote_type = 'UP'),
+            downvotes = (SELECT COUNT(*) FROM votes WHERE agent_username = moltbook_agents.username AND vote_type = 'DOWN')
+        ''',
+    )),
+
+    # ── activity_log: integer time + day partition key, hourly rollups, bounded hot segment ──
+    Migration(15, "activity_partitioning", (
+        "ALTER TABLE activity_log ADD COLUMN ts INTEGER",
+        "ALTER TABLE activity_log ADD COLUMN day INTEGER",
+        "UPDATE activity_log SET ts = CAST(strftime('%s', created_at) AS INTEGER)",
+        "UPDATE activity_log SET ts = 0 WHERE ts IS NULL",
+        "UPDATE activity_log SET day = ts / 86400",
+        "DROP INDEX IF EXISTS idx_activity_type_created",
+        "CREATE INDEX IF NOT EXISTS idx_activity_day ON activity_log(day)",
+        '''
+        CREATE TABLE IF NOT EXISTS activity_hourly (
+            hour INTEGER NOT NULL, -- unix seconds at the start of the hour
+            type TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (hour, type)
+        ) WITHOUT ROWID
+        ''',
+        # Hot segment: the newest 2000 events, pruned on insert, so "recent"
+        # reads never touch the full history.
+        '''
+        CREATE TABLE IF NOT EXISTS activity_recent (
+            id INTEGER PRIMARY KEY,
+            type TEXT,
+            username TEXT,
+            display_name TEXT,
+            created_at TEXT,
+            ts INTEGER
+        )
+        ''',
+        "CREATE INDEX IF NOT EXISTS idx_activity_recent_type_ts ON activity_recent(type, ts, id, username, display_name, created_at)",
+        '''
+        INSERT OR IGNORE INTO activity_recent (id, type, username, display_name, created_at, ts)
+        SELECT id, type, username, display_name, created_at, ts
+        FROM activity_log ORDER BY id DESC LIMIT 2000
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS activity_recent_ai AFTER INSERT ON activity_log BEGIN
+            INSERT INTO activity_recent (id, type, username, display_name, created_at, ts)
+            VALUES (new.id, new.type, new.username, new.display_name, new.created_at, new.ts);
+            DELETE FROM activity_recent WHERE id <= new.id - 2000;
+        END
+        ''',
+    )),
+
+    # ── Unified event stream (creations, scans, votes, syncs, oracle messages) ──
+    # Supersedes the activity_recent hot segment: every "recent" feed now pages
+    # the events table by its monotonic seq. activity_log keeps the long history.
+    Migration(16, "events", (
+        '''
+        CREATE TABLE IF NOT EXISTS events (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            type TEXT NOT NULL,   -- CREATION | SCAN | VOTE | SYNC | ORACLE
+            username TEXT,
+            display_name TEXT,
+            payload TEXT,         -- JSON object, shape depends on type
+            created_at TEXT,
+            ts INTEGER NOT NULL   -- unix seconds when the event was recorded
+        )
+        ''',
+        "CREATE INDEX IF NOT EXISTS idx_events_type_seq ON events(type, seq)",
+        "CREATE INDEX IF NOT EXISTS idx_events_ts ON events(ts)",
+        # Backfill existing history in chronological order
+        '''
+        INSERT INTO events (type, username, display_name, payload, created_at, ts)
+        SELECT type, username, display_name, payload, created_at, COALESCE(ts, CAST(strftime('%s', 'now') AS INTEGER))
+        FROM (
+            SELECT 'CREATION' AS type, username, display_name,
+                   json_object('trust_score', trust_score, 'faction', faction) AS payload,
+                   created_at, CAST(strftime('%s', created_at) AS INTEGER) AS ts
+            FROM moltbook_agents
+            UNION ALL
+            SELECT type, username, display_name, '{}', created_at, ts
+            FROM activity_log
+            UNION ALL
+            SELECT 'VOTE', v.agent_username, a.display_name,
+                   json_object('vote_type', v.vote_type), v.created_at,
+                   CAST(strftime('%s', v.created_at) AS INTEGER)
+            FROM votes v LEFT JOIN moltbook_agents a ON a.username = v.agent_username
+        )
+        ORDER BY julianday(created_at)
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS events_agent_created AFTER INSERT ON moltbook_agents BEGIN
+            INSERT INTO events (type, username, display_name, payload, created_at, ts)
+            VALUES ('CREATION', new.username, new.display_name,
+                    json_object('trust_score', new.trust_score, 'faction', new.faction),
+                    new.created_at, CAST(strftime('%s', 'now') AS INTEGER));
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS events_activity_logged AFTER INSERT ON activity_log BEGIN
+            INSERT INTO events (type, username, display_name, payload, created_at, ts)
+            VALUES (new.type, new.username, new.display_name, '{}', new.created_at, new.ts);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS events_vote_cast AFTER INSERT ON votes BEGIN
+            INSERT INTO events (type, username, display_name, payload, created_at, ts)
+            VALUES ('VOTE', new.agent_username,
+                    (SELECT display_name FROM moltbook_agents WHERE username = new.agent_username),
+                    json_object('vote_type', new.vote_type), new.created_at,
+                    CAST(strftime('%s', 'now') AS INTEGER));
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS events_vote_changed AFTER UPDATE ON votes BEGIN
+            INSERT INTO events (type, username, display_name, payload, created_at, ts)
+            VALUES ('VOTE', new.agent_username,
+                    (SELECT display_name FROM moltbook_agents WHERE username = new.agent_username),
+                    json_object('vote_type', new.vote_type), new.created_at,
+                    CAST(strftime('%s', 'now') AS INTEGER));
+        END
+        ''',
+        "DROP TRIGGER IF EXISTS activity_recent_ai",
+        "DROP TABLE IF EXISTS activity_recent",
+    )),
+
+    # ── Change detection: per-row version + content hash, and a changed-fields log ──
+    Migration(17, "row_versions", (
+        "ALTER TABLE moltbook_agents ADD COLUMN version INTEGER DEFAULT 0",
+        "ALTER TABLE moltbook_agents ADD COLUMN content_hash TEXT",
+        "ALTER TABLE moltbook_posts ADD COLUMN version INTEGER DEFAULT 0",
+        "ALTER TABLE moltbook_posts ADD COLUMN content_hash TEXT",
+        "UPDATE moltbook_agents SET version = 1",
+        "UPDATE moltbook_posts SET version = 1",
+        '''
+        CREATE TABLE IF NOT EXISTS row_changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT NOT NULL,
+            row_key TEXT NOT NULL,
+            op TEXT NOT NULL,        -- INSERT | UPDATE
+            version INTEGER NOT NULL,
+            fields TEXT,             -- JSON list of changed columns (NULL for INSERT)
+            ts INTEGER NOT NULL
+        )
+        ''',
+        "CREATE INDEX IF NOT EXISTS idx_row_changes_row ON row_changes(table_name, row_key, seq)",
+        "CREATE INDEX IF NOT EXISTS idx_row_changes_ts ON row_changes(ts)",
+    )),
+
+    # ── Data version: row_changes.seq becomes the single change feed for ?since= deltas ──
+    Migration(18, "data_version", (
+        "CREATE INDEX IF NOT EXISTS idx_row_changes_table_seq ON row_changes(table_name, seq)",
+        # Vote counters are recounted in SQL, outside the change-detecting upsert
+        '''
+        CREATE TRIGGER IF NOT EXISTS row_changes_agent_votes AFTER UPDATE OF upvotes, downvotes ON moltbook_agents
+        WHEN old.upvotes IS NOT new.upvotes OR old.downvotes IS NOT new.downvotes BEGIN
+            INSERT INTO row_changes (table_name, row_key, op, version, fields, ts)
+            VALUES ('moltbook_agents', new.username, 'UPDATE', COALESCE(new.version, 0),
+                    '["upvotes", "downvotes"]', CAST(strftime('%s', 'now') AS INTEGER));
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS row_changes_event_added AFTER INSERT ON events BEGIN
+            INSERT INTO row_changes (table_name, row_key, op, version, fields, ts)
+            VALUES ('events', new.seq, 'INSERT', 1, NULL, new.ts);
+        END
+        ''',
+    )),
+
+    # ── Filtered listings: equality filter, then the sort key, username as tie-breaker ──
+    Migration(19, "idx_agents_faction_trust_score", (
+        "CREATE INDEX IF NOT EXISTS idx_agents_faction_trust_score ON moltbook_agents(faction, trust_score, username)",
+    )),
+    Migration(20, "idx_agents_faction_karma", (
+        "CREATE INDEX IF NOT EXISTS idx_agents_faction_karma ON moltbook_agents(faction, karma, username)",
+    )),
+    Migration(21, "idx_agents_faction_followers", (
+        "CREATE INDEX IF NOT EXISTS idx_agents_faction_followers ON moltbook_agents(faction, followers, username)",
+    )),
+    Migration(22, "idx_agents_faction_display_name", (
+        "CREATE INDEX IF NOT EXISTS idx_agents_faction_display_name ON moltbook_agents(faction, display_name, username)",
+    )),
+    Migration(23, "idx_agents_risk_status_trust_score", (
+        "CREATE INDEX IF NOT EXISTS idx_agents_risk_status_trust_score ON moltbook_agents(risk_status, trust_score, username)",
+    )),
+    Migration(24, "idx_agents_risk_status_karma", (
+        "CREATE INDEX IF NOT EXISTS idx_agents_risk_status_karma ON moltbook_agents(risk_status, karma, username)",
+    )),
+    Migration(25, "idx_agents_risk_status_followers", (
+        "CREATE INDEX IF NOT EXISTS idx_agents_risk_status_followers ON moltbook_agents(risk_status, followers, username)",
+    )),
+    Migration(26, "idx_agents_risk_status_display_name", (
+        "CREATE INDEX IF NOT EXISTS idx_agents_risk_status_display_name ON moltbook_agents(risk_status, display_name, username)",
+    )),
+
+    # ── Listing sort keys are never NULL (keyset cursors can't step past a NULL) ──
+    Migration(27, "non_null_sort_keys", (
+        '''
+        UPDATE moltbook_agents SET
+            display_name = COALESCE(display_name, username),
+            karma = COALESCE(karma, 0),
+            followers = COALESCE(followers, 0),
+            trust_score = COALESCE(trust_score, 0)
+        WHERE display_name IS NULL OR karma IS NULL OR followers IS NULL OR trust_score IS NULL
+        ''',
+    )),
+
+    # ── A repeated vote is not a new VOTE event ──
+    Migration(28, "events_vote_changed_only", (
+        "DROP TRIGGER IF EXISTS events_vote_changed",
+        '''
+        CREATE TRIGGER IF NOT EXISTS events_vote_changed AFTER UPDATE OF vote_type ON votes
+        WHEN new.vote_type IS NOT old.vote_type BEGIN
+            INSERT INTO events (type, username, display_name, payload, created_at, ts)
+            VALUES ('VOTE', new.agent_username,
+                    (SELECT display_name FROM moltbook_agents WHERE username = new.agent_username),
+                    json_object('vote_type', new.vote_type), new.created_at,
+                    CAST(strftime('%s', 'now') AS INTEGER));
+        END
+        ''',
+    )),
+]
+
+
+def current_version(conn: sqlite3.Connection) -> int:
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        applied_at TEXT NOT NULL
+    )
+    ''')
+    conn.commit()
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return row[0] or 0
+
+
+def migrate(conn: sqlite3.Connection, migrations: List[Migration] = MIGRATIONS) -> List[int]:
+    """
+    Apply every migration newer than the recorded schema version.
+    Returns the versions applied by this call.
+    """
+    applied = []
+    if current_version(conn) >= migrations[-1].version:
+        return applied
+
+    for migration in sorted(migrations, key=lambda m: m.version):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Re-check under the write lock: another process may have won the race
+            row = conn.execute("SELECT 1 FROM schema_version WHERE version = ?", (migration.version,)).fetchone()
+            if row:
+                conn.rollback()
+                continue
+            for statement in migration.statements:
+                conn.execute(statement)
+            conn.execute(
+                "INSERT INTO schema_version (version, name, applied_at) VALUES (?, ?, ?)",
+                (migration.version, migration.name, datetime.now().isoformat()),
+            )
+            conn.commit()
+            applied.append(migration.version)
+            print(f"🗄️ Schema migration {migration.version} applied: {migration.name}")
+        except Exception:
+            conn.rollback()
+            raise
+    return applied
+
+
+def explain_query_plan(conn: sqlite3.Connection, sql: str, params: tuple = ()) -> dict:
+    """
+    Run EXPLAIN QUERY PLAN and flag full table scans and temp-b-tree sorts.
+    """
+    rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+    details = [row[3] for row in rows]
+    full_scans = [d for d in details if d.startswith("SCAN ") and "USING" not in d and "CONSTANT ROW" not in d]
+    return {
+        "plan": details,
+        "full_scan": bool(full_scans),
+        "temp_sort": any("USE TEMP B-TREE" in d for d in details),
+    }
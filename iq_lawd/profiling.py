@@ -0,0 +1,208 @@
+"""
+IQLAWD Profiling — Opt-in sampling profiler with an on-disk archive
+A background thread samples every thread's Python stack at a fixed
+interval while a session is open, and writes the counts as collapsed
+stacks (`thread;outer;...;leaf count`), ready for flamegraph.pl or
+speedscope. Sessions cover one request, a time window, or one background
+sync, and are only started with the admin token. The archive directory is
+pruned to a fixed number of files and bytes, oldest first.
+"""
+import asyncio
+import hmac
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Optional
+
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "50"))
+PROFILE_MAX_BYTES = int(os.getenv("PROFILE_MAX_BYTES", str(50 * 1024 * 1024)))
+PROFILE_MAX_SECONDS = 300
+PROFILE_HEADER = "x-iqlawd-profile"
+ADMIN_HEADER = "x-admin-token"
+
+# Threads parked in these modules are idle (waiting on a queue, lock or socket)
+_IDLE_MODULES = ("threading.py", "queue.py", "selectors.py", os.path.join("futures", "thread.py"))
+_SAFE_LABEL = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+def is_admin(token: Optional[str]) -> bool:
+    return bool(ADMIN_TOKEN) and bool(token) and hmac.compare_digest(token, ADMIN_TOKEN)
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """
+    One session at a time; `start()` returns False while another is open,
+    so a profiled request never blocks on or mixes with someone else's.
+    """
+
+    def __init__(self, directory: str = PROFILE_DIR, interval_ms: float = PROFILE_INTERVAL_MS,
+                 max_files: int = PROFILE_MAX_FILES, max_bytes: int = PROFILE_MAX_BYTES):
+        self.directory = directory
+        self.interval = interval_ms / 1000
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._label = None
+        self._started_at = 0.0
+        self._samples = Counter()
+        self._sync_requested = False
+
+    @property
+    def active(self) -> bool:
+        return self._thread is not None
+
+    # ── Sessions ────────────────────────────────────────────────
+
+    def start(self, label: str) -> bool:
+        with self._lock:
+            if self._thread is not None:
+                return False
+            self._label = _SAFE_LABEL.sub("_", label).strip("_")[:80] or "profile"
+            self._started_at = time.time()
+            self._samples = Counter()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="iqlawd-profiler", daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self) -> Optional[str]:
+        """End the session and archive it. Returns the file name, or None if nothing was sampled."""
+        with self._lock:
+            thread = self._thread
+            if thread is None:
+                return None
+            self._stop.set()
+            thread.join()
+            self._thread = None
+            return self._write()
+
+    def request_sync(self):
+        """Profile the next background sync run."""
+        self._sync_requested = True
+
+    def take_sync_request(self) -> bool:
+        requested, self._sync_requested = self._sync_requested, False
+        return requested
+
+    # ── Sampling ────────────────────────────────────────────────
+
+    def _run(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me or frame.f_code.co_filename.endswith(_IDLE_MODULES):
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(names.get(ident, f"thread-{ident}"))
+                self._samples[";".join(reversed(stack))] += 1
+
+    # ── Archive ─────────────────────────────────────────────────
+
+    def _write(self) -> Optional[str]:
+        if not self._samples:
+            return None
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.gmtime(self._started_at))
+        name = f"{stamp}-{int(self._started_at * 1000) % 1000:03d}-{self._label}.collapsed"
+        path = os.path.join(self.directory, name)
+        with open(path, "w") as f:
+            for stack, count in self._samples.most_common():
+                f.write(f"{stack} {count}\n")
+        self._prune()
+        return name
+
+    def _prune(self):
+        files = self.list()
+        total = sum(f["bytes"] for f in files)
+        # Newest first; drop from the tail
+        while files and (len(files) > self.max_files or total > self.max_bytes):
+            oldest = files.pop()
+            total -= oldest["bytes"]
+            try:
+                os.remove(os.path.join(self.directory, oldest["name"]))
+            except OSError as e:
+                print(f"⚠️ Could not prune profile {oldest['name']}: {e}")
+
+    def list(self) -> list:
+        if not os.path.isdir(self.directory):
+            return []
+        files = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".collapsed"):
+                stat = os.stat(os.path.join(self.directory, name))
+                files.append({"name": name, "bytes": stat.st_size, "created": stat.st_mtime})
+        files.sort(key=lambda f: f["created"], reverse=True)
+        return files
+
+    def path_for(self, name: str) -> Optional[str]:
+        """Archive path for `name`, refusing anything that isn't a bare archived file name."""
+        if os.path.basename(name) != name or not name.endswith(".collapsed"):
+            return None
+        path = os.path.join(self.directory, name)
+        return path if os.path.isfile(path) else None
+
+
+profiler = SamplingProfiler()
+
+
+class ProfileMiddleware:
+    """
+    Profiles a single request when it carries the admin token in the
+    X-IQLAWD-Profile header (never a query parameter, which access logs
+    record). The response says where the result went (X-Profile-File), or
+    "X-Profile: busy" if another session was already running.
+    """
+
+    def __init__(self, app, profiler: SamplingProfiler = profiler):
+        self.app = app
+        self.profiler = profiler
+
+    @staticmethod
+    def _token(scope) -> Optional[str]:
+        for key, value in scope.get("headers", ()):
+            if key == PROFILE_HEADER.encode():
+                return value.decode("latin-1")
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not ADMIN_TOKEN or not is_admin(self._token(scope)):
+            await self.app(scope, receive, send)
+            return
+        started = self.profiler.start(f'{scope["method"]}-{scope["path"]}')
+        result = {}
+
+        async def send_with_profile(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                if started:
+                    # Stop at the headers: the handler is done, only body streaming is left.
+                    # stop() joins the sampler and writes the archive, so keep it off the loop
+                    name = await asyncio.to_thread(self.profiler.stop)
+                    result["name"] = name
+                    headers.append((b"x-profile-file", (name or "empty").encode()))
+                else:
+                    headers.append((b"x-profile", b"busy"))
+                message = dict(message, headers=headers)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            if started and "name" not in result:
+                await asyncio.to_thread(self.profiler.stop)
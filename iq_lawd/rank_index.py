@@ -0,0 +1,138 @@
+"""
+IQLAWD Rank Index — In-process order statistics over trust scores
+Fenwick trees over quantized trust scores, one global and one per faction.
+An upsert moves an agent between two buckets and a rank or percentile is
+a prefix sum, so both are O(log buckets) however many agents are indexed.
+"""
+import threading
+from typing import Dict, Iterable, Optional
+
+SCORE_MIN = 0.0
+SCORE_MAX = 100.0
+# Scores are bucketed to this precision; agents in the same bucket tie
+SCORE_QUANTUM = 0.01
+
+
+class Fenwick:
+    """Binary indexed tree of counts with point update and prefix sum."""
+
+    __slots__ = ("size", "tree", "total")
+
+    def __init__(self, size: int):
+        self.size = size
+        self.tree = [0] * (size + 1)
+        self.total = 0
+
+    def add(self, i: int, delta: int):
+        self.total += delta
+        i += 1
+        while i <= self.size:
+            self.tree[i] += delta
+            i += i & -i
+
+    def prefix(self, i: int) -> int:
+        """Count of entries in buckets 0..i inclusive."""
+        count = 0
+        i += 1
+        while i > 0:
+            count += self.tree[i]
+            i -= i & -i
+        return count
+
+
+class RankIndex:
+    """
+    Thread-safe global and per-faction rank of every indexed agent.
+
+    Rank is competition ranking: 1 + the number of agents with a strictly
+    higher (quantized) score, so ties share a rank. Percentile is the share
+    of agents this one ranks at or above.
+    """
+
+    def __init__(self, lo: float = SCORE_MIN, hi: float = SCORE_MAX, quantum: float = SCORE_QUANTUM):
+        self.lo = lo
+        self.quantum = quantum
+        self.buckets = int(round((hi - lo) / quantum)) + 1
+        self.all = Fenwick(self.buckets)
+        self.factions: Dict[str, Fenwick] = {}
+        self.agents: Dict[str, tuple] = {}  # username -> (bucket, faction)
+        self.watermark = ""  # highest last_synced seen, for incremental refresh
+        self._lock = threading.Lock()
+
+    # ── Building ────────────────────────────────────────────────
+
+    def bucket(self, score) -> int:
+        b = int(round(((score or 0) - self.lo) / self.quantum))
+        return min(max(b, 0), self.buckets - 1)
+
+    def _move(self, username: str, entry: Optional[tuple]):
+        previous = self.agents.get(username)
+        if previous == entry:
+            return
+        if previous is not None:
+            self.all.add(previous[0], -1)
+            self.factions[previous[1]].add(previous[0], -1)
+        if entry is None:
+            del self.agents[username]
+            return
+        self.all.add(entry[0], 1)
+        faction = self.factions.get(entry[1])
+        if faction is None:
+            faction = self.factions[entry[1]] = Fenwick(self.buckets)
+        faction.add(entry[0], 1)
+        self.agents[username] = entry
+
+    def upsert(self, agent: dict):
+        username = agent.get("username")
+        if not username:
+            return
+        entry = (self.bucket(agent.get("trust_score", 0)), agent.get("faction") or "UNALIGNED")
+        with self._lock:
+            self._move(username, entry)
+            synced = agent.get("last_synced") or ""
+            if synced > self.watermark:
+                self.watermark = synced
+
+    def upsert_many(self, agents: Iterable[dict]):
+        for agent in agents:
+            self.upsert(agent)
+
+    def remove(self, username: str):
+        with self._lock:
+            if username in self.agents:
+                self._move(username, None)
+
+    # ── Lookup ──────────────────────────────────────────────────
+
+    @staticmethod
+    def _rank(tree: Fenwick, bucket: int) -> int:
+        return 1 + tree.total - tree.prefix(bucket)
+
+    def rank_of_score(self, score, faction: str = None) -> int:
+        """Rank an agent with `score` would have, globally or within `faction`."""
+        with self._lock:
+            tree = self.all if faction is None else self.factions.get(faction)
+            if tree is None:
+                return 1
+            return self._rank(tree, self.bucket(score))
+
+    def lookup(self, username: str) -> Optional[dict]:
+        """{rank, faction_rank, percentile, total, faction_total}, or None if not indexed."""
+        with self._lock:
+            entry = self.agents.get(username)
+            if entry is None:
+                return None
+            bucket, faction = entry
+            tree = self.factions[faction]
+            rank = self._rank(self.all, bucket)
+            total = self.all.total
+            return {
+                "rank": rank,
+                "faction_rank": self._rank(tree, bucket),
+                "percentile": round(100.0 * (total - rank + 1) / total, 2),
+                "total": total,
+                "faction_total": tree.total,
+            }
+
+    def __len__(self):
+        return len(self.agents)
@@ -0,0 +1,197 @@
+"""
+IQLAWD Tracing — Per-request span trees and a slow-request log
+Each API request gets a root span in a context variable; DB calls,
+outbound HTTP and scoring functions hang child spans off whatever span is
+current, including from worker threads that inherited the context. When
+the request finishes, its tree is offered to a per-route keeper of the
+slowest N, served at /debug/slow. Outside a traced request every hook is
+a single context-variable read.
+"""
+import contextvars
+import functools
+import heapq
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+TRACE_SLOW_KEEP = int(os.getenv("TRACE_SLOW_KEEP", "20"))
+# Children recorded per span; a sync loop's thousands of fetches are counted, not kept
+TRACE_MAX_CHILDREN = 200
+
+_current: contextvars.ContextVar = contextvars.ContextVar("iqlawd_span", default=None)
+
+
+class Span:
+    __slots__ = ("name", "kind", "start", "duration", "attrs", "children", "dropped")
+
+    def __init__(self, name: str, kind: str, attrs: dict = None):
+        self.name = name
+        self.kind = kind
+        self.start = time.perf_counter()
+        self.duration = None
+        self.attrs = attrs or {}
+        self.children = []
+        self.dropped = 0
+
+    def finish(self, duration: float = None):
+        self.duration = time.perf_counter() - self.start if duration is None else duration
+
+    def add(self, child: "Span"):
+        # list.append is atomic, so worker threads can attach children directly
+        if len(self.children) < TRACE_MAX_CHILDREN:
+            self.children.append(child)
+        else:
+            self.dropped += 1
+
+    def to_dict(self, origin: float = None) -> dict:
+        origin = self.start if origin is None else origin
+        out = {
+            "name": self.name,
+            "kind": self.kind,
+            "offset_ms": round((self.start - origin) * 1000, 3),
+            "duration_ms": round(self.duration * 1000, 3) if self.duration is not None else None,
+        }
+        if self.attrs:
+            out["attrs"] = self.attrs
+        if self.children:
+            out["children"] = [child.to_dict(origin) for child in list(self.children)]
+        if self.dropped:
+            out["dropped_children"] = self.dropped
+        return out
+
+    def breakdown(self) -> dict:
+        """Total milliseconds per span kind below this one (the request's stage breakdown)."""
+        totals = {}
+        stack = list(self.children)
+        while stack:
+            span = stack.pop()
+            if span.duration is not None:
+                totals[span.kind] = totals.get(span.kind, 0.0) + span.duration * 1000
+            stack.extend(span.children)
+        return {kind: round(ms, 3) for kind, ms in totals.items()}
+
+
+def current() -> Optional[Span]:
+    return _current.get()
+
+
+@contextmanager
+def span(name: str, kind: str = "internal", **attrs):
+    """Time the block as a child of the current span; a no-op outside a trace."""
+    parent = _current.get()
+    if parent is None:
+        yield None
+        return
+    child = Span(name, kind, attrs)
+    token = _current.set(child)
+    try:
+        yield child
+    finally:
+        _current.reset(token)
+        child.finish()
+        parent.add(child)
+
+
+def record(parent: Optional[Span], name: str, kind: str, started: float, duration: float, **attrs):
+    """Attach an already-timed span, for work timed on a thread that has no context."""
+    if parent is None:
+        return
+    child = Span(name, kind, attrs)
+    child.start = started
+    child.duration = duration
+    parent.add(child)
+
+
+def traced(kind: str, name: str = None):
+    """Decorator form of span(); the span is named after the function."""
+    def wrap(fn):
+        label = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            if _current.get() is None:
+                return fn(*args, **kwargs)
+            with span(label, kind):
+                return fn(*args, **kwargs)
+
+        return inner
+
+    return wrap
+
+
+# ── Slow Request Log ────────────────────────────────────────
+
+class SlowLog:
+    """Slowest `keep` finished traces per route (min-heaps keyed on duration)."""
+
+    def __init__(self, keep: int = TRACE_SLOW_KEEP):
+        self.keep = keep
+        self._routes = {}  # route -> [(duration, seq, entry)]
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    def offer(self, route: str, root: Span, status: int):
+        heap = self._routes.get(route)
+        if heap is not None and len(heap) >= self.keep and root.duration <= heap[0][0]:
+            return
+        entry = {
+            "route": route,
+            "status": status,
+            "at": time.time(),
+            "duration_ms": round(root.duration * 1000, 3),
+            "breakdown": root.breakdown(),
+            "trace": root.to_dict(),
+        }
+        with self._lock:
+            heap = self._routes.setdefault(route, [])
+            item = (root.duration, next(self._seq), entry)
+            if len(heap) < self.keep:
+                heapq.heappush(heap, item)
+            elif root.duration > heap[0][0]:
+                heapq.heapreplace(heap, item)
+
+    def slowest(self, route: str = None, limit: int = None) -> list:
+        with self._lock:
+            items = [item for r, heap in self._routes.items() if route is None or r == route for item in heap]
+        items.sort(key=lambda item: item[0], reverse=True)
+        return [entry for _, _, entry in items[:limit]]
+
+    def routes(self) -> dict:
+        with self._lock:
+            return {r: len(heap) for r, heap in self._routes.items()}
+
+
+slow_log = SlowLog()
+
+
+class TracingMiddleware:
+    """ASGI middleware giving every HTTP request a root span and feeding slow_log."""
+
+    def __init__(self, app, log: SlowLog = None):
+        self.app = app
+        self.log = log or slow_log
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        root = Span(f'{scope["method"]} {scope["path"]}', "request")
+        token = _current.set(root)
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            _current.reset(token)
+            root.finish()
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            self.log.offer(route, root, status)
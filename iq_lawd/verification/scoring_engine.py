@@ -4,6 +4,7 @@ NO Crypto/Financial Metrics. Pure Social Credibility.
 """
 from typing import Dict, List, Optional
 from datetime import datetime
+from iq_lawd.tracing import traced
 
 class ScoringEngine:
     def __init__(self, config=None):
@@ -77,6 +78,7 @@ class ScoringEngine:
             "details": {"has_twitter": bool(profile.get("twitter"))}
         }
 
+    @traced("scoring")
     def get_final_score(self, agent_id: str, profile: Dict, posts: List[Dict], tokens: List[Dict] = None) -> Dict:
         """Aggregates scores (Identity Only)"""
         karma = self.calculate_karma_score(profile.get("karma", 0))
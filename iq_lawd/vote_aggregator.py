@@ -0,0 +1,89 @@
+"""
+IQLAWD Vote Aggregator — Write-behind buffer for /vote
+Votes are deduplicated in memory by (agent, voter) and flushed to SQLite
+in one batched transaction every `flush_interval_ms`, so a launch-day
+vote spike costs one write-lock acquisition per interval, not per click.
+"""
+import threading
+from datetime import datetime
+
+FLUSH_INTERVAL_MS = 250
+MAX_PENDING = 5000
+
+
+class VoteAggregator:
+    def __init__(self, db, flush_interval_ms: int = FLUSH_INTERVAL_MS, max_pending: int = MAX_PENDING):
+        self.db = db
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_pending = max_pending
+        self._pending = {}  # (agent_username, voter_ip) -> (vote_type, created_at)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self.stats = {"accepted": 0, "deduplicated": 0, "flushed": 0, "batches": 0, "errors": 0}
+
+    @staticmethod
+    def normalize(vote_type: str) -> str:
+        return "UP" if (vote_type or "").upper() == "UP" else "DOWN"
+
+    def add(self, agent_username: str, vote_type: str, voter_ip: str) -> bool:
+        """Buffer a vote. A later vote from the same voter replaces the earlier one."""
+        key = (agent_username, voter_ip)
+        created_at = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+        with self._lock:
+            if key in self._pending:
+                self.stats["deduplicated"] += 1
+            self._pending[key] = (self.normalize(vote_type), created_at)
+            self.stats["accepted"] += 1
+            backlog = len(self._pending)
+        if backlog >= self.max_pending:
+            self._wake.set()
+        return True
+
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    def flush(self) -> int:
+        """Write everything buffered so far. Failed batches are re-queued, never dropped."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return 0
+            votes = [(agent, vote_type, voter, created_at)
+                     for (agent, voter), (vote_type, created_at) in batch.items()]
+            try:
+                self.db.apply_votes(votes)
+            except Exception as e:
+                print(f"Vote flush error ({len(votes)} votes re-queued): {e}")
+                with self._lock:
+                    self.stats["errors"] += 1
+                    # Votes that arrived during the failed flush are newer; keep them
+                    for key, value in batch.items():
+                        self._pending.setdefault(key, value)
+                return 0
+            with self._lock:
+                self.stats["flushed"] += len(votes)
+                self.stats["batches"] += 1
+            return len(votes)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name="vote-aggregator", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self.flush()
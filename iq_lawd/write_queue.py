@@ -0,0 +1,215 @@
+"""
+IQLAWD Write Queue — Single writer for SQLite mutations
+Every write in the process is a command `fn(conn)` handed to one writer
+thread. The writer drains whatever is queued, runs it inside a single
+BEGIN IMMEDIATE transaction (each command under its own savepoint) and
+commits once, so concurrent writers never fight over the database lock.
+Callers get a Future that resolves after the commit, for read-your-writes.
+"""
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+WRITE_QUEUE_SIZE = int(os.getenv("WRITE_QUEUE_SIZE", "10000"))
+WRITE_BATCH_MAX = int(os.getenv("WRITE_BATCH_MAX", "256"))
+# Backoff between retries when another process holds the write lock
+WRITE_RETRY_BASE_MS = 50
+WRITE_RETRY_MAX_MS = 2000
+
+
+def is_lock_error(e: Exception) -> bool:
+    return isinstance(e, sqlite3.OperationalError) and (
+        "locked" in str(e) or "busy" in str(e)
+    )
+
+
+class _LockContention(Exception):
+    """A command hit the database lock; the whole batch is retried."""
+
+
+class WriteQueue:
+    """
+    Bounded command queue drained by a single writer thread.
+
+    A command that raises an ordinary error is rolled back to its savepoint
+    and fails only its own Future. Lock contention (another process writing)
+    rolls back the batch and retries it with backoff, so no write is ever
+    dropped. When the queue is full, `submit` blocks the caller.
+    """
+
+    def __init__(self, pool, max_size: int = WRITE_QUEUE_SIZE, batch_max: int = WRITE_BATCH_MAX):
+        self.pool = pool
+        self.batch_max = batch_max
+        self._queue = queue.Queue(maxsize=max_size)
+        self._thread = None
+        self._thread_ident = None
+        self._conn = None
+        self._lock = threading.Lock()
+        # Called on the writer thread after every successful commit
+        self.commit_listeners = []
+        self.stats = {
+            "submitted": 0, "committed": 0, "failed": 0, "batches": 0,
+            "lock_retries": 0, "blocked_submits": 0, "max_depth": 0,
+            "wait_ms": 0.0, "commit_ms": 0.0,
+        }
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+                self._thread.start()
+
+    def submit(self, fn) -> Future:
+        """Queue `fn(conn)` for the writer. The Future resolves to its return value after commit."""
+        future = Future()
+        if threading.get_ident() == self._thread_ident:
+            # Issued from inside another command: join the open transaction
+            future.set_result(fn(self._conn))
+            return future
+        if self._thread is None or not self._thread.is_alive():
+            self._start()
+
+        item = (fn, future, time.perf_counter())
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            with self._lock:
+                self.stats["blocked_submits"] += 1
+            self._queue.put(item)
+        with self._lock:
+            self.stats["submitted"] += 1
+            depth = self._queue.qsize()
+            if depth > self.stats["max_depth"]:
+                self.stats["max_depth"] = depth
+        return future
+
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    # ── Writer Thread ───────────────────────────────────────────
+
+    def _run(self):
+        self._thread_ident = threading.get_ident()
+        try:
+            self._drain()
+        finally:
+            self._thread_ident = None
+
+    def _drain(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            while len(batch) < self.batch_max:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._commit_batch(batch)
+                    return
+                batch.append(item)
+            self._commit_batch(batch)
+
+    def _commit_batch(self, batch: list):
+        delay = WRITE_RETRY_BASE_MS
+        while True:
+            try:
+                results = self._try_batch(batch)
+                break
+            except Exception as e:
+                # Lock contention and pool timeouts are transient; anything else fails the batch
+                if not isinstance(e, (_LockContention, TimeoutError)) and not is_lock_error(e):
+                    for _, future, _ in batch:
+                        future.set_exception(e)
+                    with self._lock:
+                        self.stats["failed"] += len(batch)
+                    return
+                with self._lock:
+                    self.stats["lock_retries"] += 1
+                print(f"⏳ DB writer: database locked, retrying {len(batch)} writes in {delay}ms")
+                time.sleep(delay / 1000)
+                delay = min(delay * 2, WRITE_RETRY_MAX_MS)
+
+        for listener in self.commit_listeners:
+            try:
+                listener()
+            except Exception as e:
+                print(f"Commit listener error: {e}")
+
+        now = time.perf_counter()
+        failed = 0
+        for (_, future, enqueued), (ok, value) in zip(batch, results):
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+                failed += 1
+        with self._lock:
+            self.stats["batches"] += 1
+            self.stats["committed"] += len(batch) - failed
+            self.stats["failed"] += failed
+            self.stats["wait_ms"] += sum(now - enqueued for _, _, enqueued in batch) * 1000
+
+    def _try_batch(self, batch: list) -> list:
+        results = []
+        with self.pool.connection() as conn:
+            self._conn = conn
+            try:
+                started = time.perf_counter()
+                conn.execute("BEGIN IMMEDIATE")
+                for fn, _, _ in batch:
+                    conn.execute("SAVEPOINT write_cmd")
+                    try:
+                        value = fn(conn)
+                    except Exception as e:
+                        conn.execute("ROLLBACK TO write_cmd")
+                        conn.execute("RELEASE write_cmd")
+                        if is_lock_error(e):
+                            raise _LockContention(str(e)) from e
+                        results.append((False, e))
+                    else:
+                        conn.execute("RELEASE write_cmd")
+                        results.append((True, value))
+                conn.commit()
+                with self._lock:
+                    self.stats["commit_ms"] += (time.perf_counter() - started) * 1000
+            except Exception:
+                if conn.in_transaction:
+                    conn.rollback()
+                raise
+            finally:
+                self._conn = None
+        return results
+
+    # ── Lifecycle ───────────────────────────────────────────────
+
+    def metrics(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+        stats["depth"] = self._queue.qsize()
+        stats["avg_batch"] = round(stats["committed"] / stats["batches"], 2) if stats["batches"] else 0.0
+        return stats
+
+    def stop(self, timeout: float = 10):
+        """Drain everything queued so far, then stop the writer."""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout=timeout)
+
+
+_queues = {}
+_queues_lock = threading.Lock()
+
+
+def get_write_queue(pool) -> WriteQueue:
+    """One writer per database file, shared by every Database on that pool."""
+    with _queues_lock:
+        writer = _queues.get(id(pool))
+        if writer is None:
+            writer = _queues[id(pool)] = WriteQueue(pool)
+        return writer
@@ -315,11 +315,11 @@ def do_heartbeat():
 
 # ─── MAIN LOOP (no schedule module needed) ───────────────────────────────────
 
-from iq_lawd.database import Database
+from iq_lawd.database import get_db
 from iq_lawd.integrations.moltbook_api_client import MoltbookAPIClient
 
 # Initialize DB and API Client
-db = Database()
+db = get_db()
 moltbook_client = MoltbookAPIClient(api_key=API_KEY)
 
 # ─── DISCOVERY CONFIG ────────────────────────────────────────────────────────
@@ -337,7 +337,8 @@ def do_discovery():
             log("Discovery: Feed is empty.")
             return
 
-        new_count = 0
+        discovered = []
+        seen = set()
         for p in posts:
             username = None
             if isinstance(p.get("agent"), dict):
@@ -347,16 +348,24 @@ def do_discovery():
             elif isinstance(p.get("author"), str):
                 username = p["author"]
 
-            if username and not db.get_agent(username):
+            if not username or username in seen:
+                continue
+            seen.add(username)
+
+            if not db.get_agent(username):
                 log(f"Discovery: Found new agent '@{username}'. Fetching profile...")
                 agent_data = moltbook_client.fetch_agent(username)
                 if agent_data:
-                    db.upsert_agent(agent_data)
-                    new_count += 1
-                    log(f"Discovery: ✅ Agent '@{username}' indexed.")
+                    discovered.append(agent_data)
+                    log(f"Discovery: ✅ Agent '@{username}' fetched.")
                 time.sleep(1) # Rate limiting
 
-        log(f"Discovery complete. {new_count} new agents found.")
+        if discovered:
+            db.upsert_agents_bulk(discovered)
+            db.upsert_posts_bulk(post for agent in discovered for post in agent.get("posts", []))
+            db.log_event("SYNC", payload={"source": "discovery", "synced": len(discovered)})
+
+        log(f"Discovery complete. {len(discovered)} new agents indexed.")
     except Exception as e:
         log(f"Discovery error: {e}")
         traceback.print_exc()
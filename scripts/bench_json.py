@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Benchmark: API body encoding, stdlib path vs fast path.
+Seeds a throwaway database, then times query + build + encode for the
+listings, feed, factions and batch score payloads both ways:
+  stdlib — rows -> dicts -> json.dumps (the response cache's old encoder)
+  fast   — SQLite row encoders / orjson via iq_lawd.fast_json
+Endpoints that returned dicts also paid FastAPI's jsonable_encoder on the
+stdlib path, which this leaves out, so real savings are somewhat larger.
+Usage: python scripts/bench_json.py [agents] [posts]
+"""
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from iq_lawd.database import Database, LISTINGS_MAX_PAGE_SIZE
+from iq_lawd.fast_json import RawJSON, dumps, json_array, orjson
+
+AGENTS = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+POSTS = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+ROUNDS = 5
+FACTIONS = ["SOVEREIGNTY", "ORIGINS", "INCUBATOR", "SWARM", "UNALIGNED"]
+
+
+def stdlib_dumps(payload) -> bytes:
+    return json.dumps(payload, separators=(",", ":"), default=str).encode()
+
+
+def seed(db: Database):
+    random.seed(7)
+    db.upsert_agents_bulk({
+        "id": f"id-{i}",
+        "username": f"agent_{i}",
+        "display_name": f"Agent {i}",
+        "description": "Autonomous trading agent " * 4,
+        "karma": random.randint(0, 50000),
+        "followers": random.randint(0, 10000),
+        "avatar_url": f"https://cdn.example/{i}.png",
+        "x_handle": f"agent{i}",
+        "trust_score": round(random.uniform(0, 100), 1),
+        "risk_status": random.choice(["VERIFIED", "CAUTION", "HAZARDOUS"]),
+        "faction": random.choice(FACTIONS),
+        "created_at": "2026-01-01T00:00:00",
+    } for i in range(AGENTS))
+    db.upsert_posts_bulk({
+        "id": f"post-{i}",
+        "agent_username": f"agent_{random.randrange(AGENTS)}",
+        "title": f"Market note #{i}",
+        "content": "Liquidity rotated into majors overnight. " * 6,
+        "upvotes": random.randint(0, 500),
+        "created_at": f"2026-02-{1 + i % 28:02d}T{i % 24:02d}:00:00",
+    } for i in range(POSTS))
+
+
+def timed(fn) -> tuple:
+    fn()
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        body = fn()
+    return (time.perf_counter() - started) / ROUNDS * 1000, len(body)
+
+
+def main():
+    path = os.path.join(tempfile.mkdtemp(prefix="iqlawd-bench-"), "bench.db")
+    db = Database(path)
+    print(f"Seeding {AGENTS} agents / {POSTS} posts into {path} ...")
+    seed(db)
+    db.rank_index  # load once, outside the timings
+    handles = [f"agent_{random.randrange(AGENTS * 2)}" for _ in range(2000)]
+    page = LISTINGS_MAX_PAGE_SIZE
+
+    cases = [
+        (f"listings page ({page})",
+         lambda: stdlib_dumps(db.get_listings_page(limit=page)["items"]),
+         lambda: dumps(db.get_listings_page(limit=page, encoded=True)["items"])),
+        (f"all listings ({AGENTS})",
+         lambda: stdlib_dumps(_all_listings(db, False)),
+         lambda: dumps(_all_listings(db, True))),
+        (f"feed ({POSTS})",
+         lambda: stdlib_dumps(db.get_feed(POSTS)),
+         lambda: dumps(db.get_feed(POSTS, encoded=True))),
+        ("factions",
+         lambda: stdlib_dumps(db.get_factions()),
+         lambda: dumps(db.get_factions(encoded=True))),
+        (f"scores batch ({len(handles)})",
+         lambda: stdlib_dumps({"scores": db.get_scores(handles)}),
+         lambda: dumps({"scores": json_array(score for _, score in db.get_scores(handles, encoded=True))})),
+    ]
+
+    print(f"orjson: {'yes ' + orjson.__version__ if orjson else 'not installed (stdlib fallback)'}")
+    print(f"{'payload':<26}{'stdlib ms':>11}{'fast ms':>10}{'speedup':>9}{'bytes':>12}")
+    for name, slow, fast in cases:
+        slow_ms, size = timed(slow)
+        fast_ms, fast_size = timed(fast)
+        if json.loads(slow()) != json.loads(fast()):
+            print(f"⚠️ {name}: fast and stdlib bodies differ")
+        print(f"{name:<26}{slow_ms:>11.2f}{fast_ms:>10.2f}{slow_ms / fast_ms:>8.1f}x{fast_size:>12,}")
+
+    db.writer.stop()
+    db.pool.close_all()
+    shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+
+
+def _all_listings(db: Database, encoded: bool):
+    """Every listed agent, page by page, as one list (or one RawJSON array)."""
+    items, cursor = [], None
+    while True:
+        page = db.get_listings_page(limit=LISTINGS_MAX_PAGE_SIZE, cursor=cursor, encoded=encoded)
+        items.append(page["items"])
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    if not encoded:
+        return [item for chunk in items for item in chunk]
+    return RawJSON("[" + ",".join(chunk.text[1:-1] for chunk in items if chunk.text != "[]") + "]")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Check: /listings keyset paging returns every listed agent exactly once.
+Seeds a throwaway database where some agents arrive with null display
+names, karma, followers and trust scores (as partial Moltbook profiles
+do), then walks every sort, with and without filters, a few rows per
+page, on both the dict and the SQLite-encoded path.
+Usage: python scripts/verify_listings.py [agents]
+"""
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from iq_lawd.database import Database, LISTING_MIN_SCORE
+
+AGENTS = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+PAGE = 3
+
+
+def seed(db: Database) -> list:
+    random.seed(5)
+    agents = []
+    for i in range(AGENTS):
+        agents.append({
+            "id": f"id-{i}",
+            "username": f"agent_{i:03d}",
+            "display_name": None if i % 3 == 0 else random.choice(["Alpha", "Beta", "Gamma"]),
+            "karma": None if i % 4 == 0 else random.choice([0, 10, 10, 500]),
+            "followers": None if i % 5 == 0 else random.randint(0, 3),
+            "trust_score": None if i % 7 == 0 else random.choice([LISTING_MIN_SCORE, 50, 50, 90]),
+            "faction": random.choice(["SWARM", "ORIGINS"]),
+            "risk_status": random.choice(["VERIFIED", "CAUTION"]),
+        })
+    db.upsert_agents_bulk(agents)
+    return agents
+
+
+def walk(db: Database, encoded: bool, **kwargs) -> list:
+    seen, cursor = [], None
+    while True:
+        page = db.get_listings_page(limit=PAGE, cursor=cursor, encoded=encoded, **kwargs)
+        items = json.loads(page["items"].text) if encoded else page["items"]
+        seen.extend(item["username"] for item in items)
+        cursor = page["next_cursor"]
+        if not cursor:
+            return seen
+
+
+def main():
+    path = os.path.join(tempfile.mkdtemp(prefix="iqlawd-listings-"), "listings.db")
+    db = Database(path)
+    agents = seed(db)
+    failures = 0
+    for sort in db.LISTING_SORTS:
+        for filters in ({}, {"faction": "SWARM"}, {"risk_status": "CAUTION"}):
+            expected = sorted(
+                a["username"] for a in agents
+                if (a["trust_score"] or 0) >= LISTING_MIN_SCORE and all(a[k] == v for k, v in filters.items())
+            )
+            for encoded in (False, True):
+                seen = walk(db, encoded, sort_by=sort, **filters)
+                ok = sorted(seen) == expected and len(seen) == len(set(seen))
+                failures += not ok
+                print(f"{'✅' if ok else '❌'} sort={sort} {filters or ''} encoded={encoded}: "
+                      f"{len(seen)}/{len(expected)} agents")
+
+    db.writer.stop()
+    db.pool.close_all()
+    shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
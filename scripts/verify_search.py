@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Check: /agents/search full-text ranking never drops the best hit.
+Seeds a throwaway database with a broad prefix ("zeta...") of many
+low-trust agents plus one high-trust agent created last, and checks
+Database.search_agents against an exhaustive ranking of every match.
+Usage: python scripts/verify_search.py [agents]
+"""
+import os
+import random
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from iq_lawd.database import Database, SEARCH_TRUST_WEIGHT
+
+AGENTS = int(sys.argv[1]) if len(sys.argv) > 1 else 600
+
+EXHAUSTIVE_SQL = '''
+SELECT a.username
+FROM agents_fts
+JOIN moltbook_agents a ON a.rowid = agents_fts.rowid
+WHERE agents_fts MATCH ?
+ORDER BY bm25(agents_fts, 10.0, 6.0, 1.0, 4.0) - COALESCE(a.trust_score, 0) * ?
+LIMIT ?
+'''
+
+
+def seed(db: Database):
+    random.seed(11)
+    agents = [{
+        "id": f"id-{i}",
+        "username": f"zeta{i}",
+        "display_name": f"Zeta {i}",
+        "description": random.choice(["zeta swarm node", "liquidity bot", "zeta zeta relay"]),
+        "trust_score": round(random.uniform(0, 20), 1),
+        "faction": "SWARM",
+    } for i in range(AGENTS)]
+    agents.append({"id": "id-best", "username": "zetabest", "display_name": "Zeta Best", "trust_score": 99})
+    db.upsert_agents_bulk(agents)
+
+
+def main():
+    path = os.path.join(tempfile.mkdtemp(prefix="iqlawd-search-"), "search.db")
+    db = Database(path)
+    seed(db)
+    failures = 0
+    for query, limit in (("zeta", 1), ("zeta", 10), ("ze", 10), ("zeta swarm", 5), ("zeta relay", 20)):
+        got = [r["username"] for r in db.search_agents(query, limit)]
+        with db.connection() as conn:
+            match = db._fts_prefix_query(query)
+            expected = [r[0] for r in conn.execute(EXHAUSTIVE_SQL, (match, SEARCH_TRUST_WEIGHT, limit))]
+        ok = got == expected
+        failures += not ok
+        print(f"{'✅' if ok else '❌'} {query!r} limit={limit}: {got[:3]}{' ...' if len(got) > 3 else ''}")
+    if db.search_agents("zeta", 1)[0]["username"] != "zetabest":
+        failures += 1
+        print("❌ zetabest is not the top hit for 'zeta'")
+
+    db.writer.stop()
+    db.pool.close_all()
+    shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()